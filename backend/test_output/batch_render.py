@@ -0,0 +1,581 @@
+"""
+Batch lecture renderer
+Renders every lecture script (*.json) in a directory. All slides of all
+lectures share one global worker pool; a slide is only admitted when a core
+is free and its memory estimate fits in the memory still available.
+
+Script format (same as script.json, plus where to find the scenes):
+    {
+      "title": "...",
+      "manimFile": "ai_unveiled.py",        # default: <script name>.py
+      "voice": "en-US-GuyNeural",           # optional
+      "rate": "-5%",                        # optional
+      "slides": [{"title": "...", "narration": "...", "scene": "Slide1_Introduction", "memoryMb": 800,
+                  "frameRate": 24}, ...]     # frameRate optional, see frame_rates
+    }
+Slides without "scene" take the Scene classes of manimFile in file order.
+
+Run with: python batch_render.py courses/ --out-dir course_output
+"""
+import argparse
+import ast
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import duration_model
+import metrics
+import progress
+import render_cost
+from checkpoint import atomic_output, content_hash, fingerprint, get_manifest, media_duration, produced
+from encoding_profiles import DEFAULT_PROFILE, PROFILES, EncodeReport, manim_args
+from frame_rates import LAYER_CACHE_ENV, MANIM_MAIN, SLIDE_DURATION_ENV, full_frame_rate, plan_lecture, \
+    quality_env
+from generate_ai_audio import RATE, VOICE, tts_offline
+from memory_guard import MemoryBudget, available_memory_mb, estimate_mb, run_with_rss_limit
+from narration_chunks import synthesize_chunked
+from render_budget import FULL, STILL, STILL_TIMEOUT, RenderBudget, first_step, ladder, render_still
+from render_history import RenderHistory, scene_key
+from scene_check import check_scenes
+from scene_sections import render_sections
+from sync_video_audio import concat_segments, get_duration, sync_slide_with_audio
+from thumbnails import thumbs_dir_for
+from workspace import DEFAULT_GLOBAL_BUDGET_MB, DEFAULT_JOB_BUDGET_MB, DiskBudgetError, WorkspaceManager
+
+# Rough peak RSS of one `manim render` (Cairo + ffmpeg) before a scene has history
+DEFAULT_SCENE_MEMORY_MB = 600
+# Leave headroom for the OS and the encoders
+MEMORY_HEADROOM = 0.8
+# A single render above this is killed instead of taking the box down
+DEFAULT_RSS_LIMIT_MB = 4096
+# A render is killed once it takes this many times its predicted cost (but never sooner than the minimum)
+RENDER_TIMEOUT_FACTOR = 4
+MIN_RENDER_TIMEOUT = 120
+
+
+def scene_names_in_file(manim_file):
+    """Scene class names in definition order, read without importing manim"""
+    tree = ast.parse(Path(manim_file).read_text(encoding="utf-8"))
+    return [
+        node.name for node in tree.body
+        if isinstance(node, ast.ClassDef)
+        and any(getattr(base, "id", None) == "Scene" for base in node.bases)
+    ]
+
+
+def load_lecture(script_path, out_dir):
+    """Read a lecture script file and expand it into one task per slide"""
+    script_path = Path(script_path)
+    script = json.loads(script_path.read_text(encoding="utf-8"))
+    return expand_lecture(script, script_path.stem, script_path.parent, Path(out_dir) / script_path.stem)
+
+
+def expand_lecture(script, name, base_dir, work_dir):
+    """Turn a parsed lecture script into one task per slide"""
+    manim_file = Path(base_dir) / script.get("manimFile", f"{name}.py")
+    work_dir = Path(work_dir)
+
+    default_scenes = scene_names_in_file(manim_file)
+    slides = []
+    for i, slide in enumerate(script["slides"]):
+        slides.append({
+            "lecture": name,
+            "index": i,
+            "title": slide.get("title", ""),
+            "narration": slide["narration"],
+            "scene": slide.get("scene") or default_scenes[i],
+            "memory_mb": slide.get("memoryMb", DEFAULT_SCENE_MEMORY_MB),
+            "frame_rate": slide.get("frameRate"),
+            "manim_file": manim_file,
+            "work_dir": work_dir,
+            "voice": script.get("voice", VOICE),
+            "rate": script.get("rate", RATE),
+        })
+    return {"name": name, "title": script.get("title", name), "work_dir": work_dir, "slides": slides}
+
+
+def _record_render_time(history, manim_file, scene, profile, seconds):
+    metrics.RENDER_SECONDS.observe(seconds, quality=profile)
+    if history is not None:
+        render_cost.record(history, manim_file, scene, profile, seconds)
+
+
+def expected_frames(manim_file, scene, profile, frame_rate=None):
+    """Frames a scene renders, from the animation and wait time in its source; None if unknown"""
+    try:
+        animated, waits = render_cost.scene_features(manim_file, scene)[:2]
+        return round((animated + waits) * (frame_rate or full_frame_rate(profile)))
+    except (OSError, ValueError, SyntaxError):
+        return None
+
+
+def render_scene(manim_file, scene, media_dir, profile=DEFAULT_PROFILE, rss_limit_mb=None, history=None,
+                 target_duration=None, sections=1, frame_rate=None, quality=None, timeout=None):
+    """
+    Render one scene with the manim CLI under an RSS cap and return the path of its MP4.
+    With `target_duration` (the predicted narration length) the scene holds its
+    last frame until then (see frame_rates.MANIM_MAIN), so the real audio only
+    needs a small tail adjustment at sync. With `sections` > 1 a long scene is
+    split into animation ranges rendered in parallel (see scene_sections), unpadded. The scene renders at
+    the pixel size and frame rate of the profile's manim quality flag, whatever the module's config
+    sets (see frame_rates); `frame_rate` overrides that rate for this scene, `quality` the flag.
+    With a history the render is timed for the cost model, and killed once it
+    runs far past its predicted cost or past `timeout` seconds.
+    The manim process reports its frames to the progress stream itself.
+    """
+    env = dict(os.environ)
+    if progress.enabled():
+        env = progress.child_env(env, scene=scene,
+                                 total_frames=expected_frames(manim_file, scene, profile, frame_rate))
+    if target_duration is not None and sections <= 1:
+        env[SLIDE_DURATION_ENV] = f"{target_duration:.2f}"
+    quality = quality or manim_args(profile)[0]
+    # Modules set config.pixel_width/pixel_height/frame_rate themselves, which would override the flag
+    quality_env(env, quality, frame_rate)
+    if history is not None:
+        try:
+            cost = render_cost.predict(manim_file, scene, profile, history)
+        except (OSError, ValueError, SyntaxError):
+            cost = None  # Scene not readable here - no cost limit, the render reports the error
+        if cost is not None:
+            cost_timeout = max(MIN_RENDER_TIMEOUT, RENDER_TIMEOUT_FACTOR * cost)
+            timeout = min(timeout, cost_timeout) if timeout is not None else cost_timeout
+    start = time.monotonic()
+    if sections > 1:
+        output_file = Path(media_dir) / "sections" / f"{scene}.mp4"
+        try:
+            video_file, peak_mb = render_sections(manim_file, scene, output_file, Path(media_dir) / "sections",
+                                                  sections, profile, rss_limit_mb, env, timeout)
+        except RuntimeError as e:
+            print(f"  ✗ {e}")
+            return None
+        if history is not None:
+            history.record(scene_key(manim_file, scene, profile), peak_rss_mb=peak_mb)
+        if video_file is not None:
+            _record_render_time(history, manim_file, scene, profile, time.monotonic() - start)
+        return video_file
+    returncode, peak_mb, killed = run_with_rss_limit([
+        sys.executable, "-c", MANIM_MAIN, "render", quality,
+        str(manim_file), scene, "--media_dir", str(media_dir)
+    ], rss_limit_mb, timeout, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env,
+        pass_fds=progress.pass_fds())
+
+    if history is not None:
+        history.record(scene_key(manim_file, scene, profile), peak_rss_mb=peak_mb)
+    if killed == "rss":
+        print(f"  ✗ {scene} exceeded {rss_limit_mb} MB RSS and was killed")
+        return None
+    if killed == "timeout":
+        print(f"  ✗ {scene} ran longer than {timeout:.0f}s and was killed")
+        return None
+    if returncode != 0:
+        return None
+    _record_render_time(history, manim_file, scene, profile, time.monotonic() - start)
+    matches = sorted((Path(media_dir) / "videos" / Path(manim_file).stem).glob(f"*/{scene}.mp4"))
+    return matches[0] if matches else None
+
+
+def render_with_budget(slide, media_dir, profile=DEFAULT_PROFILE, rss_limit_mb=None, history=None,
+                       target_duration=None, sections=1, budget=None):
+    """
+    Render a slide's scene within its time budget, stepping down the degradation
+    ladder while the prediction or the render itself runs over (see render_budget).
+    Degraded steps render into their own media subdirectory and are never timed
+    for the cost model. Returns (video file or None, ladder step).
+    """
+    manim_file, scene = slide["manim_file"], slide["scene"]
+    allowed = budget.allowed(slide["lecture"]) if budget is not None else None
+    if allowed is None:
+        return render_scene(manim_file, scene, media_dir, profile, rss_limit_mb, history, target_duration,
+                            sections, slide.get("frame_rate")), FULL
+
+    steps = ladder(profile, slide.get("frame_rate"))
+    start = time.monotonic()
+    for index in range(first_step(slide_cost(slide, history, profile), steps, allowed), len(steps)):
+        step, quality, frame_rate = steps[index]
+        remaining = allowed - (time.monotonic() - start)
+        if step == STILL:
+            # The floor of the ladder always runs, so the lecture is always delivered
+            video_file = render_still(manim_file, scene, Path(media_dir) / step, quality,
+                                      slide.get("timeline_frame_rate") or frame_rate or 24, profile, rss_limit_mb,
+                                      max(STILL_TIMEOUT, remaining))
+        elif remaining <= 0:
+            continue
+        elif step == FULL:
+            video_file = render_scene(manim_file, scene, media_dir, profile, rss_limit_mb, history,
+                                      target_duration, sections, frame_rate, timeout=remaining)
+        else:
+            video_file = render_scene(manim_file, scene, Path(media_dir) / step, profile, rss_limit_mb, None,
+                                      target_duration, 1, frame_rate, quality, remaining)
+        if video_file is not None:
+            return video_file, step
+        print(f"  ⚠ {scene}: {step} render failed or ran out of its {allowed:.0f}s budget")
+    return None, STILL
+
+
+def narrate_slide(slide, audio_file, manifest):
+    """
+    Synthesize a slide's narration (checkpointed) and feed its length back to the duration model.
+    Sentences are synthesized in parallel and cached one by one (see narration_chunks).
+    """
+    text = "|".join((slide["voice"], slide["rate"], slide["narration"], "offline" if tts_offline() else ""))
+    audio_inputs = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    cached = manifest.is_done(audio_file.name, audio_file, audio_inputs)
+    metrics.cache_lookup("tts", cached)
+    with progress.stage("tts", lecture=slide["lecture"], slide=slide_number(slide), cached=cached) as outcome:
+        if cached:
+            return True
+        with atomic_output(audio_file) as output:
+            ok = asyncio.run(synthesize_chunked(slide["narration"], output.path, slide["voice"], slide["rate"]))
+            output.ok = ok = ok and produced(output.path)
+        if not ok:
+            outcome["failed"] = True
+            return False
+        entry = manifest.record(audio_file.name, audio_file, audio_inputs)
+        outcome.update(bytes=entry["size"], duration=entry["duration"])
+    if entry["duration"] and not tts_offline():
+        duration_model.record(slide["narration"], slide["voice"], slide["rate"], entry["duration"])
+    return True
+
+
+def slide_number(slide):
+    """1-based slide number for messages and progress events"""
+    return slide.get("number", slide["index"] + 1)
+
+
+def run_slide(slide, profile, report, rss_limit_mb=None, history=None, sections=1, workspace=None, budget=None):
+    """
+    Render, narrate and sync one slide; returns the synced segment path or None.
+    TTS runs alongside the render: the scene gets a predicted narration length
+    up front and the sync step absorbs the difference to the real audio.
+    Each step is checkpointed, so a retried slide skips whatever already finished.
+    The scene renders at the slide's planned frame rate and is upsampled to the
+    lecture's timeline rate by the sync.
+    With a `budget` the render steps down the quality ladder when it would not
+    finish in time; the step used is stored in slide["render_step"].
+    Renders and synced slides go to the slide's scratch directory when it has one;
+    with a `workspace` its disk budget is enforced and joined partial movie files
+    are dropped right away.
+    Every step is reported to the progress stream (see progress).
+    """
+    with progress.context(lecture=slide["lecture"], slide=slide_number(slide)):
+        return _run_slide(slide, profile, report, rss_limit_mb, history, sections, workspace, budget)
+
+
+def _run_slide(slide, profile, report, rss_limit_mb, history, sections, workspace, budget):
+    work_dir = slide["work_dir"]
+    work_dir.mkdir(parents=True, exist_ok=True)
+    scratch_dir = slide.get("scratch_dir", work_dir)
+    manifest = get_manifest(work_dir)
+    audio_file = work_dir / f"narration_{slide['index']:02d}.mp3"
+    synced_file = scratch_dir / f"slide_{slide['index'] + 1:02d}_synced.mp4"
+    # Slides of one lecture render side by side: separate media dirs keep manim's text SVGs apart
+    media_dir = scratch_dir / "media" / f"slide_{slide['index'] + 1:02d}"
+
+    if workspace is not None:
+        try:
+            workspace.check(slide["lecture"])
+        except DiskBudgetError as e:
+            print(f"  ✗ {slide['scene']}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=1) as tts:
+        narrated = tts.submit(narrate_slide, slide, audio_file, manifest)
+
+        render_key = f"render:{slide['scene']}"
+        render_inputs = f"{profile}|{slide.get('frame_rate')}|{content_hash(slide['manim_file'])}"
+        entry = manifest.entries.get(render_key)
+        # Only full-quality renders are reused; a degraded one gets another chance at full quality
+        cached = bool(entry) and manifest.is_done(render_key, entry["path"], f"{render_inputs}|{FULL}")
+        metrics.cache_lookup("render", cached)
+        with progress.stage("render", scene=slide["scene"], cached=cached) as outcome:
+            if cached:
+                video_file = Path(entry["path"])
+                slide["render_step"] = FULL
+            else:
+                predicted = duration_model.predict(slide["narration"], slide["voice"], slide["rate"])
+                video_file, step = render_with_budget(slide, media_dir, profile, rss_limit_mb, history, predicted,
+                                                      sections, budget)
+                if video_file is not None:
+                    slide["render_step"] = step
+                    entry = manifest.record(render_key, video_file, f"{render_inputs}|{step}")
+                    outcome.update(bytes=entry["size"], step=step)
+                    if step != FULL:
+                        metrics.DEGRADED_RENDERS.inc(step=step)
+                        print(f"  ⚠ {slide['scene']}: over budget, rendered as {step.replace('_', ' ')}")
+                    if workspace is not None:
+                        workspace.prune_render(media_dir, slide["scene"])
+                else:
+                    outcome["failed"] = True
+
+        if not narrated.result() or video_file is None:
+            return None
+
+    timeline_rate = slide.get("timeline_frame_rate")
+    sync_inputs = f"{profile}|{timeline_rate}|{fingerprint(video_file, audio_file)}"
+    cached = manifest.is_done(synced_file.name, synced_file, sync_inputs)
+    metrics.cache_lookup("segment", cached)
+    with progress.stage("sync", cached=cached) as outcome:
+        if not cached:
+            # Its thumbnails stay next to the segment until the lecture is assembled
+            if sync_slide_with_audio(video_file, audio_file, synced_file, profile, report,
+                                     thumbs_dir_for(synced_file), frame_rate=timeline_rate) is None:
+                outcome["failed"] = True
+                return None
+            outcome["bytes"] = manifest.record(synced_file.name, synced_file, sync_inputs)["size"]
+    return synced_file
+
+
+def slide_memory_mb(slide, history, profile):
+    """Memory to reserve for a slide, from its recorded peak when there is one"""
+    key = scene_key(slide["manim_file"], slide["scene"], profile)
+    return estimate_mb(history, key, slide["memory_mb"])
+
+
+def validate_lectures(lectures):
+    """
+    Dry-run every scene the lectures use, once per Manim file.
+    Returns {(manim_file, scene): error} for the scenes that failed.
+    """
+    scenes_by_file = {}
+    for lecture in lectures:
+        for slide in lecture["slides"]:
+            scenes_by_file.setdefault(slide["manim_file"], set()).add(slide["scene"])
+
+    failures = {}
+    for manim_file, scenes in scenes_by_file.items():
+        for scene, result in check_scenes(manim_file, sorted(scenes)).items():
+            if result["error"]:
+                failures[(manim_file, scene)] = result["error"]
+            for warning in result["warnings"]:
+                print(f"  ⚠ {Path(manim_file).name}:{scene} {warning}")
+    return failures
+
+
+def slide_inputs(slide, profile):
+    """Hash of everything that determines one slide of a lecture's final MP4"""
+    digest = hashlib.sha256(profile.encode("utf-8"))
+    digest.update(content_hash(slide["manim_file"]).encode("utf-8"))
+    for part in (slide["scene"], slide["title"], slide["narration"], slide["voice"], slide["rate"],
+                 str(slide.get("frame_rate")), str(slide.get("timeline_frame_rate"))):
+        digest.update(b"\0" + part.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def lecture_inputs(lecture, profile):
+    """Everything that determines a lecture's final MP4: its slide_inputs() in order"""
+    return ",".join(slide_inputs(slide, profile) for slide in lecture["slides"])
+
+
+def slide_cost(slide, history, profile):
+    """Predicted render seconds of a slide's scene"""
+    try:
+        return render_cost.predict(slide["manim_file"], slide["scene"], profile, history)
+    except (OSError, ValueError, SyntaxError):
+        return render_cost.DEFAULT_COEFFICIENTS[-1]  # Scene not readable here - let the render report it
+
+
+def run_batch(lectures, jobs, profile=DEFAULT_PROFILE, rss_limit_mb=DEFAULT_RSS_LIMIT_MB, sections=1,
+              workspace=None, budget=None):
+    """
+    Schedule every slide of every lecture on one pool. `jobs` caps concurrency
+    at the core count, with a sectioned slide taking a core per section; within
+    that, how many renders run at once is decided by the memory budget and each
+    scene's historical peak RSS.
+    Slides start longest-predicted-first so no long scene is left for the end;
+    slides whose scene fails the dry-run check are never scheduled.
+    Lecture budgets start counting when the batch starts.
+    """
+    report = EncodeReport()
+    history = RenderHistory()
+    results = {}
+    failures = validate_lectures(lectures)
+    slides = []
+    for lecture in lectures:
+        if budget is not None:
+            budget.start(lecture["name"])
+        for slide in lecture["slides"]:
+            error = failures.get((slide["manim_file"], slide["scene"]))
+            if error:
+                # Never give a render slot to a scene that cannot even be built
+                print(f"  ✗ {slide['lecture']} slide {slide['index'] + 1}: {slide['scene']}: {error}")
+                results[(slide["lecture"], slide["index"])] = None
+            else:
+                slides.append(slide)
+    costs = {(slide["lecture"], slide["index"]): slide_cost(slide, history, profile) for slide in slides}
+    pending = deque(sorted(slides, key=lambda slide: costs[(slide["lecture"], slide["index"])], reverse=True))
+    # Actual/predicted seconds of finished slides; also absorbs TTS and sync time
+    predicted_done = actual_done = 0.0
+    # A sectioned render runs up to `sections` manim processes side by side, each on its own core
+    parallel = jobs // max(1, min(sections, jobs))
+    print(f"  Predicted render time: {render_cost.format_eta(sum(costs.values()) / parallel)} "
+          f"(longest slide {render_cost.format_eta(max(costs.values(), default=0))})")
+
+    free_mb = available_memory_mb()
+    memory = MemoryBudget(free_mb * MEMORY_HEADROOM if free_mb else None)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            # Admit slides while they have free cores and their memory estimate fits
+            while pending and len(running) < parallel:
+                slide = pending[0]
+                memory_mb = slide_memory_mb(slide, history, profile)
+                if not memory.try_acquire(memory_mb):
+                    break
+                pending.popleft()
+                future = pool.submit(run_slide, slide, profile, report, rss_limit_mb, history, sections,
+                                     workspace, budget)
+                running[future] = (slide, memory_mb, time.monotonic())
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                slide, memory_mb, started = running.pop(future)
+                memory.release(memory_mb)
+                try:
+                    segment = future.result()
+                except Exception as e:
+                    # One broken slide fails its lecture, not the whole batch
+                    print(f"  ✗ {slide['scene']}: {e}")
+                    segment = None
+                key = (slide["lecture"], slide["index"])
+                results[key] = segment
+                predicted_done += costs[key]
+                actual_done += time.monotonic() - started
+
+                # Remaining work in predicted seconds, corrected by how far off the predictions ran so far
+                now = time.monotonic()
+                remaining = sum(costs[(s["lecture"], s["index"])] for s in pending)
+                remaining += sum(max(0.0, costs[(s["lecture"], s["index"])] - (now - t)) for s, _, t in
+                                 running.values())
+                eta = remaining * (actual_done / predicted_done if predicted_done else 1.0) / parallel
+                progress.emit("batch", done=len(results), total=len(results) + len(running) + len(pending),
+                              running=len(running), queued=len(pending), eta_s=round(eta, 1))
+                status = "✓" if segment else "✗"
+                print(f"  {status} {slide['lecture']} slide {slide['index'] + 1}: {slide['scene']} "
+                      f"({len(running)} running, {len(pending)} queued, {memory.reserved_mb:.0f} MB reserved, "
+                      f"ETA {render_cost.format_eta(eta)})")
+
+    return results, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a directory of lecture scripts")
+    parser.add_argument("script_dir", help="directory containing lecture script JSON files")
+    parser.add_argument("--out-dir", default="batch_output", help="where lectures are written")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="max concurrent slides (default: cores)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE)
+    parser.add_argument("--rss-limit-mb", type=int, default=DEFAULT_RSS_LIMIT_MB,
+                        help="kill a scene render whose memory exceeds this")
+    parser.add_argument("--sections", type=int, default=1,
+                        help="split long scenes into up to N animation ranges rendered in parallel")
+    parser.add_argument("--metrics-file", help="keep an OpenMetrics textfile updated at this path")
+    parser.add_argument("--metrics-port", type=int, help="serve OpenMetrics on 127.0.0.1:PORT/metrics")
+    parser.add_argument("--no-tmpfs", action="store_true", help="keep scratch files on disk, not in /dev/shm")
+    parser.add_argument("--job-budget-mb", type=int, default=DEFAULT_JOB_BUDGET_MB,
+                        help="disk a single lecture may use while building")
+    parser.add_argument("--disk-budget-mb", type=int, default=DEFAULT_GLOBAL_BUDGET_MB,
+                        help="disk all lectures together may use while building")
+    parser.add_argument("--keep-intermediates", action="store_true",
+                        help="do not delete scratch files after the final video verified")
+    parser.add_argument("--no-layer-cache", action="store_true",
+                        help="re-rasterize static mobjects at every play (see static_layers)")
+    parser.add_argument("--scene-budget", type=float,
+                        help="seconds a scene render may take before it is degraded")
+    parser.add_argument("--lecture-budget", type=float,
+                        help="seconds from batch start by which every lecture must be done")
+    parser.add_argument("--progress", metavar="TARGET",
+                        help="write NDJSON progress events to fd:N, unix:PATH, tcp:HOST:PORT or a file")
+    args = parser.parse_args()
+
+    if args.progress:
+        progress.configure(args.progress)
+
+    if args.no_layer_cache:
+        os.environ[LAYER_CACHE_ENV] = "0"  # Inherited by every manim render
+    if args.metrics_file:
+        metrics.start_textfile_writer(args.metrics_file)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+
+    lectures = []
+    for path in sorted(Path(args.script_dir).glob("*.json")):
+        lecture = plan_lecture(load_lecture(path, args.out_dir), args.profile)
+        final_output = Path(args.out_dir) / f"{lecture['name']}.mp4"
+        if get_manifest(lecture["work_dir"]).is_done(final_output.name, final_output,
+                                                     lecture_inputs(lecture, args.profile)):
+            print(f"  ↺ {lecture['name']}: up to date")
+            continue
+        lectures.append(lecture)
+    total_slides = sum(len(lecture["slides"]) for lecture in lectures)
+
+    workspace = WorkspaceManager(args.out_dir, args.job_budget_mb, args.disk_budget_mb, not args.no_tmpfs)
+    for lecture in lectures:
+        lecture["scratch_dir"] = workspace.scratch_dir(lecture["name"], len(lecture["slides"]), lecture["work_dir"])
+        for slide in lecture["slides"]:
+            slide["scratch_dir"] = lecture["scratch_dir"]
+
+    print("=" * 60)
+    print(f"Batch render: {len(lectures)} lectures, {total_slides} slides, {args.jobs} workers")
+    print("=" * 60)
+
+    start = time.monotonic()
+    budget = None
+    if args.scene_budget or args.lecture_budget:
+        budget = RenderBudget(args.scene_budget, args.lecture_budget)
+    results, report = run_batch(lectures, args.jobs, args.profile, args.rss_limit_mb, args.sections, workspace,
+                                budget)
+
+    print("\nAssembling lectures...")
+    video_seconds = 0.0
+    for lecture in lectures:
+        segments = [results.get((lecture["name"], slide["index"])) for slide in lecture["slides"]]
+        if not all(segments):
+            print(f"  ✗ {lecture['name']}: {segments.count(None)} slides failed")
+            continue
+        final_output = Path(args.out_dir) / f"{lecture['name']}.mp4"
+        with progress.stage("concat", lecture=lecture["name"], slides=len(segments)) as outcome:
+            joined = concat_segments(segments, final_output, lecture["scratch_dir"] / "synced_list.txt",
+                                     args.profile, lecture["slides"], thumbs_dir_for(final_output))
+            outcome.update(failed=not joined, bytes=final_output.stat().st_size if joined else None)
+        if joined:
+            duration = get_duration(final_output)
+            video_seconds += duration
+            degraded = [slide for slide in lecture["slides"] if slide.get("render_step", FULL) != FULL]
+            if not degraded:
+                # A degraded lecture stays out of date so the next build renders it at full quality
+                get_manifest(lecture["work_dir"]).record(final_output.name, final_output,
+                                                         lecture_inputs(lecture, args.profile))
+            print(f"  ✓ {final_output} ({int(duration // 60)}m {int(duration % 60)}s)")
+            for slide in degraded:
+                print(f"    ⚠ slide {slide['index'] + 1} ({slide['scene']}) rendered as {slide['render_step']}")
+            if not args.keep_intermediates:
+                expected = sum(media_duration(segment) or 0 for segment in segments)
+                freed = workspace.finish(lecture["name"], final_output, expected)
+                if freed is None:
+                    print(f"    ⚠ {final_output.name} did not verify - intermediates kept")
+                else:
+                    print(f"    ♻ Reclaimed {freed / (1024 * 1024):.1f} MB of intermediates")
+        else:
+            print(f"  ✗ {lecture['name']}: concat failed")
+
+    wall_hours = (time.monotonic() - start) / 3600
+    print("\n" + "=" * 60)
+    print(f"✅ Rendered {video_seconds / 60:.1f} min of video in {wall_hours * 60:.1f} min wall-clock")
+    if wall_hours:
+        print(f"   Throughput: {video_seconds / 60 / wall_hours:.1f} min of video per hour")
+    if workspace.reclaimed:
+        print(f"   Reclaimed: {workspace.reclaimed / (1024 * 1024):.1f} MB of intermediates")
+    report.print_summary()
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Crash-safe checkpoints for long lecture builds
+Every finished artifact is appended to a journal (one fsynced JSON line per
+artifact) together with its size, duration and a fingerprint of its inputs.
+On restart an artifact is reused only if it still matches its journal entry,
+so a build that died on slide 7 resumes at slide 7.
+
+Outputs are written to a ".partial" name first and renamed into place only
+once the writer succeeded, so a crash never leaves a truncated file under
+the final name.
+"""
+import hashlib
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import metrics
+from encoding_profiles import get_duration
+
+JOURNAL_NAME = "progress.jsonl"
+# ffprobe durations of the same file can differ in the last decimal place
+DURATION_TOLERANCE = 0.05
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+def fingerprint(*paths):
+    """Cheap signature of input files (size and mtime) so stale outputs are not reused"""
+    parts = []
+    for path in paths:
+        stat = Path(path).stat()
+        parts.append(f"{Path(path).name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(parts)
+
+
+def content_hash(*paths):
+    """Hash of file contents, for small inputs like scene sources that get rewritten in place"""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(Path(path).read_bytes())
+    return digest.hexdigest()
+
+
+def partial_path(path, tag=""):
+    """Temp name next to `path` that keeps its extension so ffmpeg picks the right muxer"""
+    path = Path(path)
+    return path.with_name(f"{path.stem}.partial{tag}{path.suffix}")
+
+
+class PartialFile:
+    """Temp file of an atomic_output block; set `ok` once its writer succeeded"""
+
+    def __init__(self, path):
+        self.path = path
+        self.ok = False
+
+
+@contextmanager
+def atomic_output(path, shared=False):
+    """
+    Yield a PartialFile to write to; its temp file is renamed to `path` only if
+    the block set `ok` and finished without raising, and deleted otherwise.
+    With `shared`, the temp name is unique to this call, for targets concurrent
+    writers may both produce (each rename replaces the file with a complete one).
+    """
+    path = Path(path)
+    output = PartialFile(partial_path(path, f".{uuid.uuid4().hex[:8]}" if shared else ""))
+    temp = output.path
+    if temp.exists():
+        temp.unlink()  # Left over from a crashed run
+    try:
+        yield output
+        if output.ok:
+            metrics.BYTES_WRITTEN.inc(temp.stat().st_size, kind=path.suffix.lstrip(".") or "other")
+            os.replace(temp, path)
+    finally:
+        if temp.exists():
+            temp.unlink()
+
+
+def produced(temp_file):
+    """
+    True if a writer left a non-empty temp file, for writers (ffmpeg, TTS) whose
+    exit status alone does not prove they wrote anything. Check this, never
+    target.exists(): a failed rerun leaves the previous target in place.
+    """
+    return temp_file.exists() and temp_file.stat().st_size > 0
+
+
+def media_duration(path):
+    try:
+        return get_duration(path)
+    except ValueError:
+        return None  # ffprobe could not read it - truncated or corrupt
+
+
+class Manifest:
+    """Append-only journal of verified artifacts for one build directory"""
+
+    def __init__(self, directory):
+        self.path = Path(directory) / JOURNAL_NAME
+        self.entries = {}
+        self.lock = threading.Lock()
+        if self.path.exists():
+            for line in self.path.read_text(encoding="utf-8").splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line from a crash mid-append
+                self.entries[entry["key"]] = entry
+
+    def is_done(self, key, path, inputs=""):
+        """True if `path` is the artifact recorded for `key` and still verifies"""
+        entry = self.entries.get(key)
+        path = Path(path)
+        if entry is None or entry["inputs"] != inputs or not path.exists():
+            return False
+        if path.stat().st_size != entry["size"]:
+            return False
+        if entry["duration"] is not None:
+            duration = media_duration(path)
+            if duration is None or abs(duration - entry["duration"]) > DURATION_TOLERANCE:
+                return False
+        return True
+
+    def record(self, key, path, inputs="", media=True):
+        """Journal a finished artifact; `media=False` skips the duration probe"""
+        path = Path(path)
+        entry = {
+            "key": key,
+            "path": str(path),
+            "size": path.stat().st_size,
+            "duration": media_duration(path) if media else None,
+            "inputs": inputs,
+        }
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.entries[key] = entry
+        return entry
+
+
+def get_manifest(directory):
+    """Shared Manifest per build directory, so worker threads append to one journal"""
+    key = Path(directory).resolve()
+    with _manifests_lock:
+        if key not in _manifests:
+            _manifests[key] = Manifest(key)
+        return _manifests[key]
@@ -0,0 +1,169 @@
+"""
+Narration duration estimator
+Predicts how long edge-tts will take to speak a narration so scenes can be
+timed (and rendered) while synthesis is still running. The model is linear
+in syllables plus short (, ; :) and long (. ! ?) punctuation pauses, fitted
+per voice and rate on narrations that were already synthesized. When the
+real audio arrives only a small tail adjustment is left for the sync step.
+
+Calibrate from the bundled narrations with: python duration_model.py
+"""
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+from encoding_profiles import get_duration
+from generate_ai_audio import NARRATIONS, OUTPUT_DIR, RATE, VOICE
+
+MODEL_FILE = Path("duration_model.json")
+# Used until a voice/rate has enough samples: ~4.3 syllables/s at +0%
+DEFAULT_COEFFICIENTS = [0.23, 0.25, 0.45, 0.3]
+# Fitting 4 coefficients to barely more narrations just reproduces their noise
+MIN_SAMPLES = 5 * len(DEFAULT_COEFFICIENTS)
+# Only the latest narrations of a voice/rate are kept, so the file and the refit stay small
+SAMPLE_WINDOW = 200
+
+_lock = threading.Lock()
+
+
+def count_syllables(word):
+    """Vowel-group heuristic; good enough for English narration timing"""
+    word = word.lower().strip("'")
+    if not word:
+        return 0
+    if word.isdigit():
+        return 2 * len(word)  # Years and numbers are spoken as several words
+    groups = re.findall(r"[aeiouy]+", word)
+    count = len(groups)
+    if word.endswith("e") and not word.endswith(("le", "ee")) and count > 1:
+        count -= 1
+    return max(1, count)
+
+
+def features(text):
+    """[syllables, short pauses, long pauses, 1] for the linear model"""
+    words = re.findall(r"[A-Za-z0-9']+", text)
+    syllables = sum(count_syllables(word) for word in words)
+    short_pauses = len(re.findall(r"[,;:–—-]\s", text))
+    long_pauses = len(re.findall(r"[.!?]+(\s|$)", text))
+    return [syllables, short_pauses, long_pauses, 1]
+
+
+def model_key(voice, rate):
+    return f"{voice}|{rate}"
+
+
+def _rate_factor(rate):
+    """edge-tts rate like '-5%' -> speaking time multiplier"""
+    try:
+        return 1 / (1 + float(str(rate).rstrip("%")) / 100)
+    except ValueError:
+        return 1.0
+
+
+def _solve(matrix, vector):
+    """Gaussian elimination with partial pivoting for the small normal equations"""
+    n = len(vector)
+    rows = [row[:] + [value] for row, value in zip(matrix, vector)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        if abs(rows[pivot][col]) < 1e-9:
+            return None
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(n):
+            if r != col:
+                factor = rows[r][col] / rows[col][col]
+                rows[r] = [a - factor * b for a, b in zip(rows[r], rows[col])]
+    return [rows[i][n] / rows[i][i] for i in range(n)]
+
+
+def fit(samples):
+    """Least-squares coefficients from [features..., seconds] samples"""
+    n = len(samples[0]) - 1
+    xtx = [[sum(s[i] * s[j] for s in samples) for j in range(n)] for i in range(n)]
+    xty = [sum(s[i] * s[n] for s in samples) for i in range(n)]
+    # A little ridge towards zero keeps sparse pause counts from blowing up
+    for i in range(n):
+        xtx[i][i] += 1e-3
+    return _solve(xtx, xty)
+
+
+def _load():
+    try:
+        return json.loads(MODEL_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"samples": {}, "models": {}}
+
+
+@contextmanager
+def _file_lock():
+    """Exclusive lock around a read-modify-write of the model file"""
+    if fcntl is None:
+        yield
+        return
+    with open(MODEL_FILE.with_name(MODEL_FILE.name + ".lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def _save(data):
+    temp = MODEL_FILE.with_name(f"{MODEL_FILE.name}.{os.getpid()}.tmp")
+    temp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    os.replace(temp, MODEL_FILE)
+
+
+def predict(text, voice, rate="+0%"):
+    """Predicted narration length in seconds"""
+    coefficients = _load()["models"].get(model_key(voice, rate))
+    if coefficients is None:
+        coefficients = [c * _rate_factor(rate) for c in DEFAULT_COEFFICIENTS]
+    return max(0.5, sum(c * x for c, x in zip(coefficients, features(text))))
+
+
+def record(text, voice, rate, seconds):
+    """Add a synthesized narration to the latest SAMPLE_WINDOW of its voice/rate and refit them"""
+    key = model_key(voice, rate)
+    with _lock, _file_lock():
+        # Other processes (batch workers, the server, shard nodes) may have recorded since
+        data = _load()
+        samples = data["samples"].get(key, [])[-(SAMPLE_WINDOW - 1):] + [features(text) + [seconds]]
+        data["samples"][key] = samples
+        if len(samples) >= MIN_SAMPLES:
+            coefficients = fit(samples)
+            if coefficients is not None:
+                data["models"][key] = coefficients
+        _save(data)
+
+
+def calibrate(pairs, voice, rate):
+    """Calibrate from (text, audio_path) pairs of existing narrations"""
+    for text, audio_path in pairs:
+        if Path(audio_path).exists():
+            record(text, voice, rate, get_duration(audio_path))
+
+
+def main():
+    print("Calibrating narration duration model...")
+    calibrate([(text, OUTPUT_DIR / f"narration_{i:02d}.mp3") for i, text in enumerate(NARRATIONS)], VOICE, RATE)
+
+    script_file = Path("script.json")
+    if script_file.exists():
+        slides = json.loads(script_file.read_text(encoding="utf-8"))["slides"]
+        calibrate([(slide["narration"], f"narration_{i:02d}.mp3") for i, slide in enumerate(slides)],
+                  "en-US-JennyNeural", "+0%")
+
+    for text, audio_path in zip(NARRATIONS, sorted(OUTPUT_DIR.glob("narration_*.mp3"))):
+        actual = get_duration(audio_path)
+        print(f"  {audio_path.name}: predicted {predict(text, VOICE, RATE):.1f}s, actual {actual:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
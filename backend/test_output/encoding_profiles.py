@@ -0,0 +1,159 @@
+"""
+Named x264 encoding profiles for slide videos
+Slides are mostly static vector graphics, so every profile uses long GOPs
+and x264 tunes meant for flat, synthetic images instead of camera footage.
+"""
+import subprocess
+import time
+from pathlib import Path
+
+import metrics
+import progress
+
+DEFAULT_PROFILE = "web"
+
+PROFILES = {
+    # Fast previews while iterating on a script
+    "draft": {
+        "manim_quality": "-ql",
+        "preset": "ultrafast",
+        "tune": "stillimage",
+        "crf": 30,
+        "keyint_seconds": 10,
+        "threads": 2,
+        "audio_bitrate": "96k",
+        "faststart": False,
+    },
+    # What gets published to the learning platform
+    "web": {
+        "manim_quality": "-qm",
+        "preset": "medium",
+        "tune": "stillimage",
+        "crf": 23,
+        "keyint_seconds": 5,
+        "threads": 4,
+        "audio_bitrate": "128k",
+        "faststart": True,
+    },
+    # Master copy kept for re-editing later
+    "archive": {
+        "manim_quality": "-qh",
+        "preset": "slow",
+        "tune": "animation",
+        "crf": 18,
+        "keyint_seconds": 2,
+        "threads": 0,
+        "audio_bitrate": "192k",
+        "faststart": True,
+    },
+}
+
+
+def get_profile(name):
+    """Look up a profile by name, failing loudly on typos"""
+    if name not in PROFILES:
+        raise ValueError(f"Unknown encoding profile '{name}' (choose from: {', '.join(PROFILES)})")
+    return PROFILES[name]
+
+
+def video_args(name, fps=24):
+    """ffmpeg output arguments for the video stream of a profile"""
+    profile = get_profile(name)
+    keyint = max(1, int(round(profile["keyint_seconds"] * fps)))
+    return [
+        "-c:v", "libx264",
+        "-preset", profile["preset"],
+        "-tune", profile["tune"],
+        "-crf", str(profile["crf"]),
+        "-g", str(keyint),
+        "-keyint_min", str(keyint),
+        "-sc_threshold", "0",
+        "-pix_fmt", "yuv420p",
+        "-threads", str(profile["threads"]),
+    ]
+
+
+def audio_args(name):
+    """ffmpeg output arguments for the audio stream of a profile"""
+    return ["-c:a", "aac", "-b:a", get_profile(name)["audio_bitrate"]]
+
+
+def container_args(name):
+    """ffmpeg muxer arguments for the final MP4"""
+    return ["-movflags", "+faststart"] if get_profile(name)["faststart"] else []
+
+
+def manim_args(name):
+    """Quality flag passed to `manim render` so scene renders follow the profile"""
+    return [get_profile(name)["manim_quality"]]
+
+
+def get_duration(file_path):
+    """Get media file duration in seconds"""
+    result = subprocess.run([
+        "ffprobe", "-v", "error", 
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        str(file_path)
+    ], capture_output=True, text=True)
+    return float(result.stdout.strip())
+
+
+def get_frame_rate(file_path):
+    """Get the average frame rate of the first video stream"""
+    result = subprocess.run([
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=avg_frame_rate",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        str(file_path)
+    ], capture_output=True, text=True)
+    num, _, den = result.stdout.strip().partition("/")
+    try:
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+class EncodeReport:
+    """Collects per-encode timings and prints encode fps and bytes per minute by profile"""
+
+    def __init__(self):
+        self.entries = []
+
+    def timed(self, name, cmd, output_file, duration, fps):
+        """Run an ffmpeg command and record how fast it encoded `duration` seconds of video"""
+        metrics.FFMPEG_INVOCATIONS.inc(stage="sync")
+        metrics.FRAMES_ENCODED.inc(round(duration * fps), stage="sync")
+        start = time.monotonic()
+        result = progress.run_ffmpeg(cmd, "sync", round(duration * fps))
+        elapsed = time.monotonic() - start
+        output_file = Path(output_file)
+        if output_file.exists():
+            self.entries.append({
+                "profile": name,
+                "frames": duration * fps,
+                "seconds": duration,
+                "elapsed": elapsed,
+                "bytes": output_file.stat().st_size,
+            })
+        return result
+
+    def summary(self):
+        totals = {}
+        for entry in self.entries:
+            total = totals.setdefault(entry["profile"], {"frames": 0, "seconds": 0, "elapsed": 0, "bytes": 0})
+            for key in total:
+                total[key] += entry[key]
+        return {
+            name: {
+                "encode_fps": t["frames"] / t["elapsed"] if t["elapsed"] else 0.0,
+                "bytes_per_minute": t["bytes"] / (t["seconds"] / 60) if t["seconds"] else 0.0,
+            }
+            for name, t in totals.items()
+        }
+
+    def print_summary(self):
+        for name, stats in self.summary().items():
+            print(f"   [{name}] encode: {stats['encode_fps']:.1f} fps, "
+                  f"{stats['bytes_per_minute'] / (1024 * 1024):.2f} MB/min")
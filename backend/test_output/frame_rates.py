@@ -0,0 +1,196 @@
+"""
+Content-adaptive frame rates per scene
+Most slides are static text with a few fades, which look the same at 12 fps
+as at 24 but cost half the frames to rasterize. Every scene gets its own
+render frame rate:
+
+    declared   a FRAME_RATE class attribute on the scene (or "frameRate" on
+               the slide in a lecture script) is always honoured
+    auto       scenes whose animations only fade, write or create things
+               render at CALM_FRAME_RATE; anything that moves, transforms
+               or runs updaters keeps the profile's full frame rate
+
+The full rate is the frame rate of the profile's manim quality flag. Scenes
+render at it and at the flag's pixel size even when the module sets
+config.frame_rate or config.pixel_width/pixel_height, so the profile
+controls what a render costs (see render_cost.PROFILE_SCALE). A lecture's
+output timeline runs at the highest rate of its slides; slower scenes are
+upsampled (frames repeated) when they are synced, so every segment reaches
+the final copy-concat with the same frame rate.
+
+Run with: python frame_rates.py ai_unveiled.py --profile web
+"""
+import argparse
+import ast
+from pathlib import Path
+
+from encoding_profiles import DEFAULT_PROFILE, PROFILES, get_profile
+from progress import PROGRESS_ENV
+from render_cost import _scene_class
+
+CALM_FRAME_RATE = 12
+# Frame rate manim uses for each quality flag
+QUALITY_FRAME_RATES = {"-ql": 15, "-qm": 30, "-qh": 60, "-qp": 60, "-qk": 60}
+# (width, height) manim renders at for each quality flag
+QUALITY_RESOLUTIONS = {"-ql": (854, 480), "-qm": (1280, 720), "-qh": (1920, 1080), "-qp": (2560, 1440),
+                       "-qk": (3840, 2160)}
+# Animations that move or deform mobjects; at a low frame rate these visibly stutter
+MOTION_ANIMATIONS = {
+    "Transform", "ReplacementTransform", "TransformFromCopy", "TransformMatchingShapes", "TransformMatchingTex",
+    "ClockwiseTransform", "CounterclockwiseTransform", "MoveToTarget", "MoveAlongPath", "ApplyMethod",
+    "ApplyMatrix", "ApplyPointwiseFunction", "Homotopy", "Rotate", "Rotating", "SpinInFromNothing", "Wiggle",
+    "ShowPassingFlash", "Circumscribe", "Flash", "Indicate", "Broadcast",
+}
+# Calls that make mobjects change every frame
+UPDATER_CALLS = {"add_updater", "always_redraw", "ValueTracker", "TracedPath"}
+
+FRAME_RATE_ENV = "SCENE_FRAME_RATE"
+# "WIDTHxHEIGHT" to render at, overriding the module's config.pixel_width/pixel_height
+PIXEL_SIZE_ENV = "SCENE_PIXEL_SIZE"
+# Predicted narration length in seconds; the scene's final wait is padded to it
+SLIDE_DURATION_ENV = "SLIDE_DURATION"
+# Set to "0" to render without the static layer cache (see static_layers)
+LAYER_CACHE_ENV = "LECTURE_LAYER_CACHE"
+# `manim` entry point of the pipeline: renders every scene at $SCENE_FRAME_RATE and
+# $SCENE_PIXEL_SIZE, even when the module sets config.frame_rate or config.pixel_width/
+# pixel_height itself (module code runs after the CLI flags are read),
+# with the static layer cache unless $LECTURE_LAYER_CACHE is "0", and reporting its frames
+# to the progress stream when $LECTURE_PROGRESS is set. With $SLIDE_DURATION the scene holds
+# its last frame until the predicted narration ends, so sync only adjusts a short tail.
+MANIM_MAIN = f"""
+import os
+import sys
+from manim import config
+from manim.scene.scene import Scene
+
+sys.path.insert(0, {str(Path(__file__).resolve().parent)!r})
+if os.environ.get("{LAYER_CACHE_ENV}", "1") != "0":
+    import static_layers
+    static_layers.install()
+if os.environ.get("{PROGRESS_ENV}"):
+    import progress
+    progress.install_frame_hook()
+
+_init = Scene.__init__
+
+def _init_overridden(self, *args, **kwargs):
+    if os.environ.get("{FRAME_RATE_ENV}"):
+        config.frame_rate = float(os.environ["{FRAME_RATE_ENV}"])
+    if os.environ.get("{PIXEL_SIZE_ENV}"):
+        width, _, height = os.environ["{PIXEL_SIZE_ENV}"].partition("x")
+        config.pixel_width, config.pixel_height = int(width), int(height)
+    _init(self, *args, **kwargs)
+
+if os.environ.get("{FRAME_RATE_ENV}") or os.environ.get("{PIXEL_SIZE_ENV}"):
+    Scene.__init__ = _init_overridden
+
+_tear_down = Scene.tear_down
+
+def _pad_to_narration(self):
+    _tear_down(self)
+    remaining = float(os.environ["{SLIDE_DURATION_ENV}"]) - self.renderer.time
+    if remaining > 1 / config.frame_rate:
+        self.wait(remaining)
+
+if os.environ.get("{SLIDE_DURATION_ENV}"):
+    Scene.tear_down = _pad_to_narration
+
+from manim.__main__ import main
+main()
+"""
+
+
+def _number(node):
+    try:
+        value = ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError):
+        return None
+    return value if isinstance(value, (int, float)) and value > 0 else None
+
+
+def full_frame_rate(profile=DEFAULT_PROFILE):
+    """Full frame rate of a profile: that of its manim quality flag"""
+    return QUALITY_FRAME_RATES.get(get_profile(profile)["manim_quality"], 30)
+
+
+def quality_env(env, quality, frame_rate=None):
+    """
+    Set `env` so MANIM_MAIN renders at the pixel size and frame rate of a manim
+    quality flag (or at `frame_rate`), whatever the module sets in its config
+    """
+    env[PIXEL_SIZE_ENV] = "{}x{}".format(*QUALITY_RESOLUTIONS[quality])
+    env[FRAME_RATE_ENV] = f"{frame_rate or QUALITY_FRAME_RATES[quality]:g}"
+    return env
+
+
+def declared_frame_rate(manim_file, scene):
+    """FRAME_RATE class attribute of a scene, or None"""
+    node, _ = _scene_class(manim_file, scene)
+    for statement in node.body:
+        if isinstance(statement, ast.Assign) and any(getattr(t, "id", None) == "FRAME_RATE"
+                                                     for t in statement.targets):
+            return _number(statement.value)
+    return None
+
+
+def motion_in(manim_file, scene):
+    """Sorted names of the motion animations and updaters a scene uses"""
+    node, _ = _scene_class(manim_file, scene)
+    found = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name) and child.id in MOTION_ANIMATIONS | UPDATER_CALLS:
+            found.add(child.id)
+        elif isinstance(child, ast.Attribute) and child.attr in UPDATER_CALLS | {"animate"}:
+            found.add(f".{child.attr}")
+    return sorted(found)
+
+
+def scene_frame_rate(manim_file, scene, full_rate, declared=None):
+    """Render frame rate of a scene: declared, else full rate with motion, else the calm rate"""
+    declared = declared or declared_frame_rate(manim_file, scene)
+    if declared:
+        return declared
+    return full_rate if motion_in(manim_file, scene) else min(CALM_FRAME_RATE, full_rate)
+
+
+def plan_lecture(lecture, profile=DEFAULT_PROFILE):
+    """
+    Resolve every slide's render frame rate and the lecture's timeline rate.
+    Sets slide["frame_rate"], slide["timeline_frame_rate"] and lecture["frame_rate"].
+    """
+    full_rate = full_frame_rate(profile)
+    for slide in lecture["slides"]:
+        slide["frame_rate"] = scene_frame_rate(slide["manim_file"], slide["scene"], full_rate,
+                                               slide.get("frame_rate"))
+    lecture["frame_rate"] = max((slide["frame_rate"] for slide in lecture["slides"]), default=None)
+    for slide in lecture["slides"]:
+        slide["timeline_frame_rate"] = lecture["frame_rate"]
+    return lecture
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the frame rate each scene would render at")
+    parser.add_argument("manim_file", help="Manim script")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE)
+    args = parser.parse_args()
+
+    from batch_render import scene_names_in_file
+
+    full_rate = full_frame_rate(args.profile)
+    print(f"Full frame rate: {full_rate:g} fps")
+    rates = []
+    for scene in scene_names_in_file(args.manim_file):
+        rate = scene_frame_rate(args.manim_file, scene, full_rate)
+        rates.append(rate)
+        if declared_frame_rate(args.manim_file, scene):
+            reason = "declared"
+        else:
+            reason = ", ".join(motion_in(args.manim_file, scene)) or "calm"
+        print(f"  {scene:<28} {rate:>4g} fps  ({reason})")
+    if rates:
+        frames_saved = 1 - sum(rates) / (len(rates) * max(rates))
+        print(f"Timeline: {max(rates):g} fps, ~{frames_saved:.0%} fewer frames rendered (equal scene lengths)")
+
+
+if __name__ == "__main__":
+    main()
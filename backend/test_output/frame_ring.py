@@ -0,0 +1,84 @@
+"""
+Shared-memory frame ring between renderer and encoder
+The renderer hands over the camera's pixel array itself, which is copied
+once, into a preallocated slot of a shared-memory ring; a writer thread
+feeds the slots straight to the encoder pipe as memoryviews (no tobytes()
+allocation per frame) and hands them back. Pipe writes release the GIL, so rasterizing the next frame
+and encoding the previous ones overlap on different cores, and the renderer
+only blocks when every slot is still waiting for the encoder.
+
+Held frames (wait(), frozen slide tails) are queued once with a repeat count
+instead of being copied again.
+"""
+import queue
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+DEFAULT_SLOTS = 8
+
+
+def _write_all(stream, chunk):
+    """Raw (unbuffered) pipe writes may be partial"""
+    while chunk:
+        written = stream.write(chunk)
+        chunk = chunk[written:]
+
+
+class FrameRing:
+    def __init__(self, stream, frame_shape, slots=DEFAULT_SLOTS):
+        """`stream` must be unbuffered (Popen(..., bufsize=0).stdin) so writes skip Python's copy"""
+        self.stream = stream
+        self.frame_bytes = int(np.prod(frame_shape))
+        self.shm = shared_memory.SharedMemory(create=True, size=self.frame_bytes * slots)
+        self.frames = np.ndarray((slots, *frame_shape), dtype=np.uint8, buffer=self.shm.buf)
+        self.free = queue.Queue()
+        for slot in range(slots):
+            self.free.put(slot)
+        self.ready = queue.Queue()
+        self.error = None
+        self.writer = threading.Thread(target=self._drain, daemon=True)
+        self.writer.start()
+
+    def push(self, frame, repeat=1):
+        """Copy `frame` into a free slot and queue it to be encoded `repeat` times"""
+        if self.error is not None:
+            raise self.error
+        slot = self.free.get()
+        np.copyto(self.frames[slot], frame)
+        self.ready.put((slot, repeat))
+
+    def _drain(self):
+        view = memoryview(self.shm.buf)
+        try:
+            while True:
+                item = self.ready.get()
+                if item is None:
+                    break
+                slot, repeat = item
+                if self.error is None:
+                    chunk = view[slot * self.frame_bytes:(slot + 1) * self.frame_bytes]
+                    try:
+                        for _ in range(repeat):
+                            _write_all(self.stream, chunk)
+                    except OSError as e:
+                        self.error = e  # Encoder died; keep recycling slots so push() can raise
+                    finally:
+                        chunk.release()
+                self.free.put(slot)
+        finally:
+            view.release()
+
+    def close(self):
+        """Wait until every queued frame reached the encoder, then free the shared memory"""
+        try:
+            self.ready.put(None)
+            self.writer.join()
+        finally:
+            # /dev/shm outlives the process: always unlink, even when interrupted
+            del self.frames
+            self.shm.close()
+            self.shm.unlink()
+        if self.error is not None:
+            raise self.error
@@ -1,10 +1,18 @@
 """Generate audio for AI Unveiled video"""
 import asyncio
+import os
 import subprocess
+import sys
+import time
 from pathlib import Path
 
+import metrics
+
 OUTPUT_DIR = Path("ai_unveiled_output")
-OUTPUT_DIR.mkdir(exist_ok=True)
+VOICE = "en-US-GuyNeural"
+RATE = "-5%"
+# Set to 1 to replace edge-tts with silence of the predicted length (load tests, no network)
+OFFLINE_ENV = "LECTURE_TTS_OFFLINE"
 
 # Narrations from the script
 NARRATIONS = [
@@ -18,20 +26,46 @@ NARRATIONS = [
     "As we stand on the brink of AI's potential, it's clear that this technology isn't just about machines; it's about us. How we develop, use, and regulate AI will define the future. So, let's continue this journey with curiosity, creativity, and caution."
 ]
 
+def tts_offline():
+    return os.environ.get(OFFLINE_ENV) == "1"
+
+
+async def synthesize_silence(text, output_file, voice=VOICE, rate=RATE):
+    """Offline stand-in for edge-tts: silence as long as the narration is predicted to be"""
+    from duration_model import predict  # duration_model imports this module
+
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-y", "-f", "lavfi", "-i", "anullsrc=r=24000:cl=mono",
+        "-t", f"{predict(text, voice, rate):.3f}", "-c:a", "libmp3lame", "-q:a", "9", str(output_file),
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+    )
+    await process.wait()
+    return process.returncode == 0 and Path(output_file).exists()
+
+
+async def synthesize(text, output_file, voice=VOICE, rate=RATE):
+    """Synthesize one narration with edge-tts, returning True if the file was written"""
+    if tts_offline():
+        return await synthesize_silence(text, output_file, voice, rate)
+    start = time.monotonic()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "edge_tts", "--voice", voice, f"--rate={rate}",
+        "--text", text, "--write-media", str(output_file),
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    await process.communicate()
+    metrics.TTS_SECONDS.observe(time.monotonic() - start)
+    return process.returncode == 0 and Path(output_file).exists()
+
 async def generate_audio():
     print("Generating audio for AI Unveiled video...")
+    OUTPUT_DIR.mkdir(exist_ok=True)
     
     for i, text in enumerate(NARRATIONS):
         output_file = OUTPUT_DIR / f"narration_{i:02d}.mp3"
-        escaped_text = text.replace('"', '\\"').replace("'", "\\'")
-        
-        cmd = f'python -m edge_tts --voice "en-US-GuyNeural" --rate="-5%" --text "{escaped_text}" --write-media "{output_file}"'
         
         print(f"  Generating slide {i+1}/8...")
-        process = await asyncio.create_subprocess_shell(cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-        await process.communicate()
-        
-        if output_file.exists():
+        if await synthesize(text, output_file):
             print(f"    ✓ {output_file.name}")
         else:
             print(f"    ✗ Failed")
@@ -41,6 +75,7 @@ async def generate_audio():
     list_content = "\n".join([f"file 'narration_{i:02d}.mp3'" for i in range(8)])
     (OUTPUT_DIR / "audio_list.txt").write_text(list_content)
     
+    metrics.FFMPEG_INVOCATIONS.inc(stage="audio_concat")
     subprocess.run([
         "ffmpeg", "-y", "-f", "concat", "-safe", "0",
         "-i", str(OUTPUT_DIR / "audio_list.txt"),
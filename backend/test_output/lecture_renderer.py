@@ -0,0 +1,363 @@
+"""
+One-pass lecture renderer
+Runs every slide scene of a Manim module in order inside one process and
+pipes all frames into a single long-lived ffmpeg encoder, with the slide
+narrations muxed in alongside. No partial movie files, per-scene MP4s or
+synced slides are written.
+
+Run with: python lecture_renderer.py ai_unveiled.py --audio-dir ai_unveiled_output -o AI_Unveiled_OnePass.mp4
+"""
+import argparse
+import importlib.util
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from manim import Scene, config
+from manim.renderer.cairo_renderer import CairoRenderer
+from manim.scene.scene_file_writer import SceneFileWriter
+
+import metrics
+import progress
+import text_cache
+from checkpoint import atomic_output
+from encoding_profiles import DEFAULT_PROFILE, PROFILES, audio_args, container_args, get_duration, manim_args, \
+    video_args
+from frame_ring import FrameRing
+from frame_rates import QUALITY_RESOLUTIONS, full_frame_rate, scene_frame_rate
+from splice import index_entries, write_chapters, write_index
+from static_layers import LayerCachingRenderer
+from thumbnails import ThumbnailCollector, thumbs_dir_for
+
+
+def load_scene_module(manim_file):
+    """Import a Manim script and return it with its Scene classes in definition order"""
+    manim_file = Path(manim_file)
+    spec = importlib.util.spec_from_file_location(manim_file.stem, manim_file)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[manim_file.stem] = module
+    spec.loader.exec_module(module)
+
+    scenes = [
+        obj for obj in vars(module).values()
+        if isinstance(obj, type) and issubclass(obj, Scene) and obj.__module__ == module.__name__
+    ]
+    return module, scenes
+
+
+class LectureEncoder:
+    """
+    A single ffmpeg process fed raw RGBA frames on stdin.
+    Each slide is padded (last frame frozen) or trimmed to a frame-exact
+    target length so the narration audio lines up with slide boundaries.
+    With narrations the boundaries are known up front, so every slide starts
+    on a keyframe and, with `slides` (scene names and titles), gets a chapter.
+    Frames go through a shared-memory FrameRing so the renderer keeps
+    rasterizing while a writer thread feeds the encoder.
+    """
+
+    def __init__(self, output_file, width, height, fps, narrations=None, profile=DEFAULT_PROFILE,
+                 thumbnails=None, slides=None):
+        self.output_file = Path(output_file)
+        self.thumbnails = thumbnails
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frames_written = 0
+        self.slide_frames = 0
+        self.target_frames = None
+        self.last_frame = None
+        total_frames = sum(frames for _, frames in narrations) if narrations else None
+        self.reporter = progress.FrameReporter("one_pass", total_frames)
+
+        cmd = [
+            "ffmpeg", "-y",
+            "-f", "rawvideo", "-pix_fmt", "rgba",
+            "-s", f"{width}x{height}", "-r", str(fps),
+            "-i", "pipe:0",
+        ]
+
+        narrations = narrations or []
+        for audio_path, _ in narrations:
+            cmd += ["-i", str(audio_path)]
+        durations = [frames / fps for _, frames in narrations]
+        self.chapters_file = None
+        if narrations and slides:
+            self.chapters_file = write_chapters(index_entries(durations, slides), self.output_file.with_name(
+                f"{self.output_file.name}.chapters.txt"))
+            cmd += ["-f", "ffmetadata", "-i", str(self.chapters_file), "-map_chapters", str(len(narrations) + 1)]
+
+        if narrations:
+            # Pad/trim each narration to its slide's frame-exact length, then join
+            chains = []
+            for i, (_, frames) in enumerate(narrations):
+                seconds = frames / fps
+                chains.append(f"[{i + 1}:a]aresample=48000,apad=whole_dur={seconds:.6f},"
+                              f"atrim=end={seconds:.6f}[a{i}]")
+            joined = "".join(f"[a{i}]" for i in range(len(narrations)))
+            chains.append(f"{joined}concat=n={len(narrations)}:v=0:a=1[a]")
+            cmd += ["-filter_complex", ";".join(chains), "-map", "0:v", "-map", "[a]", *audio_args(profile)]
+
+        if len(durations) > 1:
+            # Slide starts as keyframes: seeking to a slide decodes nothing before it
+            starts = [sum(durations[:i]) for i in range(1, len(durations))]
+            cmd += ["-force_key_frames", ",".join(f"{start:.6f}" for start in starts), "-forced-idr", "1"]
+        cmd += [*video_args(profile, fps), *container_args(profile), str(self.output_file)]
+
+        # Unbuffered stdin: the ring writes its shared-memory slots to the pipe directly
+        metrics.FFMPEG_INVOCATIONS.inc(stage="one_pass")
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+        self.ring = FrameRing(self.process.stdin, (height, width, 4))
+
+    def begin_slide(self, target_frames=None):
+        self.slide_frames = 0
+        self.target_frames = target_frames
+
+    def write_frame(self, frame, count=1):
+        """
+        Queue `frame` to be encoded `count` times (held frames are copied only once).
+        `frame` may be the camera's live pixel array: the ring has its copy before this returns.
+        """
+        if self.target_frames is not None:
+            # Slide runs longer than its narration - drop the tail
+            count = min(count, self.target_frames - self.slide_frames)
+        if count <= 0:
+            return
+        self.ring.push(frame, count)
+        metrics.FRAMES_ENCODED.inc(count, stage="one_pass")
+        if self.thumbnails is not None:
+            self.thumbnails.add_frame(frame, self.frames_written, count)
+        self.last_frame = frame
+        self.slide_frames += count
+        self.frames_written += count
+        if self.reporter.due():
+            self.reporter.update(self.frames_written, self._output_bytes())
+
+    def _output_bytes(self):
+        try:
+            return self.output_file.stat().st_size
+        except OSError:
+            return None
+
+    def end_slide(self, fallback_frame=None):
+        """Freeze the last frame until the slide reaches its target length"""
+        if self.target_frames is None:
+            return
+        frame = self.last_frame if self.slide_frames else fallback_frame
+        if frame is not None:
+            self.write_frame(frame, self.target_frames - self.slide_frames)
+
+    def close(self):
+        if self.thumbnails is not None:
+            self.thumbnails.finish(self.frames_written)
+        try:
+            self.ring.close()
+        except OSError:
+            pass  # Broken pipe - the return code below reports the failure
+        self.process.stdin.close()
+        ok = self.process.wait() == 0
+        if self.chapters_file is not None:
+            self.chapters_file.unlink(missing_ok=True)
+        self.reporter.update(self.frames_written, self._output_bytes(), force=True)
+        return ok
+
+    def abort(self):
+        """Stop the encoder after a failed render and free the frame ring's shared memory"""
+        self.process.kill()  # Pending pipe writes fail, so the ring drains instead of blocking
+        try:
+            self.ring.close()
+        except OSError:
+            pass
+        self.process.wait()
+        if self.chapters_file is not None:
+            self.chapters_file.unlink(missing_ok=True)
+
+
+class RingFrameRenderer:
+    """
+    Renderer mixin that hands the file writer the camera's pixel array itself
+    instead of a get_frame() copy, so each frame is copied once, into its ring slot
+    """
+
+    def render(self, scene, time, moving_mobjects):
+        self.update_frame(scene, moving_mobjects)
+        self.add_frame(self.camera.pixel_array)
+
+    def freeze_current_frame(self, duration):
+        dt = 1 / self.camera.frame_rate
+        self.add_frame(self.camera.pixel_array, num_frames=int(duration / dt))
+
+
+class RingCairoRenderer(RingFrameRenderer, CairoRenderer):
+    pass
+
+
+class RingLayerCachingRenderer(RingFrameRenderer, LayerCachingRenderer):
+    pass
+
+
+class PipeFileWriter(SceneFileWriter):
+    """
+    Scene file writer that sends frames to the shared LectureEncoder instead of movie files.
+    A scene rendered below the encoder's frame rate has its frames repeated to fill the timeline.
+    """
+
+    encoder = None
+
+    def __init__(self, renderer, scene_name, **kwargs):
+        self.renderer = renderer
+        self.scene_name = scene_name
+        self.sections = []
+        self.scene_frames = 0
+        self.timeline_frames = 0
+
+    def init_output_directories(self, scene_name):
+        pass
+
+    def next_section(self, *args, **kwargs):
+        pass
+
+    def add_partial_movie_file(self, hash_animation):
+        pass
+
+    def is_already_cached(self, hash_invocation):
+        return False
+
+    def begin_animation(self, allow_write=False, file_path=None):
+        pass
+
+    def end_animation(self, allow_write=False):
+        pass
+
+    def write_frame(self, frame_or_renderer, num_frames=1):
+        # Counted cumulatively so non-integer rate ratios do not drift
+        self.scene_frames += num_frames
+        count = round(self.scene_frames * self.encoder.fps / config.frame_rate) - self.timeline_frames
+        self.timeline_frames += count
+        self.encoder.write_frame(frame_or_renderer, count)
+
+    def add_audio_segment(self, *args, **kwargs):
+        pass
+
+    def add_sound(self, *args, **kwargs):
+        pass
+
+    def save_final_image(self, image):
+        pass
+
+    def finish(self):
+        pass
+
+
+def render_lecture(manim_file, output_file, audio_files=None, scene_names=None, profile=DEFAULT_PROFILE,
+                   cache_text=True, cache_layers=True):
+    """Render the scenes of `manim_file` back to back into one MP4"""
+    if cache_text:
+        text_cache.install()
+    _, scenes = load_scene_module(manim_file)
+    if scene_names:
+        by_name = {scene.__name__: scene for scene in scenes}
+        scenes = [by_name[name] for name in scene_names]
+
+    # Nothing may touch the disk besides the encoder output
+    config.disable_caching = True
+    config.write_to_movie = False
+    config.save_last_frame = False
+
+    # The profile's manim quality sets the size and full rate, whatever the module's config says
+    config.pixel_width, config.pixel_height = QUALITY_RESOLUTIONS[manim_args(profile)[0]]
+    # Calm scenes render at a lower rate; the encoder runs at the fastest scene's rate
+    full_rate = full_frame_rate(profile)
+    rates = [scene_frame_rate(manim_file, scene.__name__, full_rate) for scene in scenes]
+    fps = max(rates)
+    narrations = None
+    if audio_files:
+        if len(audio_files) != len(scenes):
+            raise ValueError(f"{len(scenes)} scenes but {len(audio_files)} narration files")
+        narrations = [(path, int(round(get_duration(path) * fps))) for path in audio_files]
+
+    slides = [{"scene": scene.__name__} for scene in scenes]  # Chapters take the scene names
+    start = time.monotonic()
+    # Poster, chapter thumbnails and sprites come from the frames being encoded
+    thumbnails = ThumbnailCollector(thumbs_dir_for(output_file), fps)
+
+    renderer_class = RingLayerCachingRenderer if cache_layers else RingCairoRenderer
+    layer_stats = {"reused": 0, "extended": 0, "rebuilt": 0}
+    with atomic_output(output_file) as output:
+        encoder = LectureEncoder(output.path, config.pixel_width, config.pixel_height, fps, narrations, profile,
+                                 thumbnails, slides)
+        PipeFileWriter.encoder = encoder
+
+        try:
+            for i, scene_class in enumerate(scenes):
+                print(f"  Slide {i+1}/{len(scenes)}: {scene_class.__name__}")
+                encoder.begin_slide(narrations[i][1] if narrations else None)
+                config.frame_rate = rates[i]  # Read by the camera the renderer creates
+                scene = scene_class(renderer=renderer_class(file_writer_class=PipeFileWriter))
+                with progress.stage("render", slide=i + 1, scene=scene_class.__name__, frame_rate=rates[i]):
+                    scene.render()
+                for name, count in getattr(scene.renderer, "layer_stats", {}).items():
+                    layer_stats[name] += count
+                encoder.end_slide(scene.renderer.camera.pixel_array)
+                thumbnails.end_slide(i, encoder.last_frame)
+                print(f"    ✓ {encoder.slide_frames} frames (rendered at {rates[i]:g} fps)")
+        except BaseException:
+            encoder.abort()
+            raise
+
+        output.ok = ok = encoder.close()
+    if ok and narrations:
+        # Slides start on keyframes, so the one-pass output can be patched like an assembled one
+        write_index(output_file, [frames / fps for _, frames in narrations], slides)
+    elapsed = time.monotonic() - start
+    print(f"  Encoded {encoder.frames_written} frames in {elapsed:.1f}s "
+          f"({encoder.frames_written / elapsed:.1f} fps)")
+    if cache_text:
+        print(f"  Text cache: {text_cache.stats['hits']} hits, {text_cache.stats['misses']} misses")
+    if cache_layers:
+        print(f"  Static layers: {layer_stats['reused']} reused, {layer_stats['extended']} extended, "
+              f"{layer_stats['rebuilt']} rasterized from scratch")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a whole lecture in one pass")
+    parser.add_argument("manim_file", help="Manim script containing the slide scenes")
+    parser.add_argument("-o", "--output", required=True, help="final MP4 path")
+    parser.add_argument("--audio-dir", help="directory with narration_XX.mp3 files, one per slide")
+    parser.add_argument("--scenes", nargs="+", help="scene names in order (default: all, in file order)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE)
+    parser.add_argument("--no-text-cache", action="store_true", help="build every Text from scratch")
+    parser.add_argument("--no-layer-cache", action="store_true",
+                        help="re-rasterize static mobjects at every play (see static_layers)")
+    parser.add_argument("--progress", metavar="TARGET",
+                        help="write NDJSON progress events to fd:N, unix:PATH, tcp:HOST:PORT or a file")
+    parser.add_argument("--metrics-file", help="keep an OpenMetrics textfile updated at this path")
+    parser.add_argument("--metrics-port", type=int, help="serve OpenMetrics on 127.0.0.1:PORT/metrics")
+    args = parser.parse_args()
+
+    if args.progress:
+        progress.configure(args.progress)
+    if args.metrics_file:
+        metrics.start_textfile_writer(args.metrics_file)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+
+    audio_files = None
+    if args.audio_dir:
+        audio_files = sorted(Path(args.audio_dir).glob("narration_*.mp3"))
+
+    print("=" * 60)
+    print(f"One-pass render: {args.manim_file} -> {args.output}")
+    print("=" * 60)
+
+    if render_lecture(args.manim_file, args.output, audio_files, args.scenes, args.profile,
+                      not args.no_text_cache, not args.no_layer_cache):
+        print(f"\n✅ Lecture rendered: {args.output}")
+    else:
+        print("\n✗ Encoder failed")
+
+
+if __name__ == "__main__":
+    main()
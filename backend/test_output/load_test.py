@@ -0,0 +1,183 @@
+"""
+Render node load test
+Submits synthetic lectures to an in-process RenderServer with Poisson
+arrivals and measures how the full pipeline (scene renders, sync, concat)
+holds up. Lectures are random runs of slides from the bundled scene modules;
+TTS runs offline (silence of the predicted narration length) so the
+numbers do not depend on the network.
+
+Reports jobs/hour, p50/p95/p99 end-to-end latency and how long slides
+waited for a worker, for memory admission and for assembly.
+
+Run with: python load_test.py --jobs 20 --rate 30 --workers 4
+"""
+import argparse
+import json
+import math
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+from batch_render import expand_lecture, scene_names_in_file
+from encoding_profiles import PROFILES
+from generate_ai_audio import NARRATIONS, OFFLINE_ENV, RATE, VOICE
+from render_server import RenderServer
+
+# Bundled (manim file, voice, rate, narrations); slides pair scenes with narrations in order
+SCENE_MODULES = [
+    ("ai_unveiled.py", VOICE, RATE, NARRATIONS),
+    ("ml_video_extended.py", VOICE, RATE, "script.json"),
+]
+
+
+def slide_pool():
+    """(manim_file, voice, rate, [(scene, title, narration), ...]) for every bundled module"""
+    pool = []
+    for manim_file, voice, rate, narrations in SCENE_MODULES:
+        if not Path(manim_file).exists():
+            continue
+        if isinstance(narrations, str):
+            slides = json.loads(Path(narrations).read_text(encoding="utf-8"))["slides"]
+            narrations = [(slide["title"], slide["narration"]) for slide in slides]
+        else:
+            narrations = [(f"Slide {i + 1}", text) for i, text in enumerate(narrations)]
+        scenes = scene_names_in_file(manim_file)
+        pool.append((manim_file, voice, rate,
+                     [(scene, title, text) for scene, (title, text) in zip(scenes, narrations)]))
+    return pool
+
+
+def synthetic_lecture(pool, number, out_dir, rng, min_slides, max_slides, unique=True):
+    """A lecture of consecutive slides from one bundled module"""
+    manim_file, voice, rate, slides = rng.choice(pool)
+    count = rng.randint(min(min_slides, len(slides)), min(max_slides, len(slides)))
+    start = rng.randint(0, len(slides) - count)
+    name = f"load_{number:04d}"
+    script = {
+        "title": f"Load test lecture {number}",
+        "manimFile": manim_file,
+        "voice": voice,
+        "rate": rate,
+        "slides": [
+            # A per-lecture sentence keeps slides from being deduplicated across jobs
+            {"scene": scene, "title": title, "narration": f"{text} This is lecture {number}." if unique else text}
+            for scene, title, text in slides[start:start + count]
+        ],
+    }
+    return expand_lecture(script, name, Path.cwd(), Path(out_dir) / name)
+
+
+def percentile(values, p):
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def wait_for(job):
+    with job.changed:
+        while not job.finished:
+            job.changed.wait()
+
+
+def summarize(jobs):
+    """Throughput, latency and stage-wait statistics from finished jobs' events"""
+    latencies, stages = [], {"queue_s": [], "admission_s": [], "run_s": [], "assemble_s": []}
+    done = [job for job in jobs if job.state == "done"]
+    for job in jobs:
+        for event in job.events:
+            for stage, values in stages.items():
+                if stage in event:
+                    values.append(event[stage])
+    for job in done:
+        latencies.append(job.events[-1]["ts"] - job.events[0]["ts"])
+
+    first_submit = min((job.events[0]["ts"] for job in jobs), default=0)
+    last_finish = max((job.events[-1]["ts"] for job in jobs), default=0)
+    hours = (last_finish - first_submit) / 3600
+    return {
+        "submitted": len(jobs),
+        "done": len(done),
+        "failed": len(jobs) - len(done),
+        "jobs_per_hour": len(done) / hours if hours else 0.0,
+        "slides_per_hour": sum(len(job.lecture["slides"]) for job in done) / hours if hours else 0.0,
+        "latency": {f"p{p}": percentile(latencies, p) for p in (50, 95, 99)},
+        "stages": {stage: {f"p{p}": percentile(values, p) for p in (50, 95, 99)}
+                   for stage, values in stages.items()},
+    }
+
+
+def _seconds(value):
+    return "-" if value is None else f"{value:.1f}s"
+
+
+def print_summary(summary):
+    print(f"  Jobs: {summary['submitted']} submitted, {summary['done']} done, {summary['failed']} failed")
+    print(f"  Throughput: {summary['jobs_per_hour']:.1f} jobs/hour ({summary['slides_per_hour']:.1f} slides/hour)")
+    latency = summary["latency"]
+    print(f"  End-to-end latency: p50 {_seconds(latency['p50'])}, p95 {_seconds(latency['p95'])}, "
+          f"p99 {_seconds(latency['p99'])}")
+    labels = {"queue_s": "worker queue", "admission_s": "memory admission", "run_s": "slide run",
+              "assemble_s": "assembly"}
+    print("  Per-stage time (p50 / p95 / p99):")
+    for stage, label in labels.items():
+        values = summary["stages"][stage]
+        print(f"    {label:<18} {_seconds(values['p50']):>8} {_seconds(values['p95']):>8} "
+              f"{_seconds(values['p99']):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the render pipeline with synthetic lectures")
+    parser.add_argument("--jobs", type=int, default=20, help="lectures to submit")
+    parser.add_argument("--rate", type=float, default=30, help="mean arrivals per hour (Poisson)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="draft")
+    parser.add_argument("--min-slides", type=int, default=2)
+    parser.add_argument("--max-slides", type=int, default=6)
+    parser.add_argument("--reuse", action="store_true", help="let identical slides be shared between jobs")
+    parser.add_argument("--online-tts", action="store_true", help="use real edge-tts instead of silence")
+    parser.add_argument("--out-dir", default="load_test_output")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the summary to this file")
+    args = parser.parse_args()
+
+    if not args.online_tts:
+        os.environ[OFFLINE_ENV] = "1"
+    rng = random.Random(args.seed)
+    pool = slide_pool()
+    server = RenderServer(args.out_dir, args.workers)
+
+    print("=" * 60)
+    print(f"Load test: {args.jobs} lectures at {args.rate:g}/hour, {args.workers} workers, {args.profile}")
+    print("=" * 60)
+
+    jobs = []
+    for number in range(args.jobs):
+        if number:
+            time.sleep(rng.expovariate(args.rate / 3600))
+        lecture = synthetic_lecture(pool, number, args.out_dir, rng, args.min_slides, args.max_slides,
+                                    not args.reuse)
+        job = server.submit(lecture, profile=args.profile)
+        jobs.append(job)
+        print(f"  → {lecture['name']}: {len(lecture['slides'])} slides "
+              f"({sum(not job.finished for job in jobs)} in progress)")
+
+    waiters = [threading.Thread(target=wait_for, args=(job,)) for job in jobs]
+    for waiter in waiters:
+        waiter.start()
+    for waiter in waiters:
+        waiter.join()
+
+    summary = summarize(jobs)
+    print("\n" + "=" * 60)
+    print_summary(summary)
+    print("=" * 60)
+    if args.json:
+        Path(args.json).write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+RSS-capped render sandboxes
+Runs a render command in its own process group, samples the resident memory
+of the whole process tree (manim plus the ffmpeg it spawns) and kills the
+group if it goes over the limit. MemoryBudget then uses the recorded peaks
+to decide how many renders may run at once.
+
+Sampling reads /proc, so limits are only enforced on Linux; elsewhere the
+command runs unguarded and no peak is recorded.
+"""
+import os
+import signal
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+PROC = Path("/proc")
+SAMPLE_INTERVAL = 0.25
+# Historical peaks are padded so a slightly heavier re-render still fits
+PEAK_MARGIN = 1.2
+
+
+def _children(pid):
+    try:
+        parents = {}
+        for stat_file in PROC.glob("[0-9]*/stat"):
+            try:
+                fields = stat_file.read_text().rsplit(")", 1)[1].split()
+            except (OSError, IndexError):
+                continue
+            parents.setdefault(int(fields[1]), []).append(int(stat_file.parent.name))
+    except OSError:
+        return []
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(parents.get(current, []))
+    return tree
+
+
+def tree_rss_mb(pid):
+    """Resident memory of a process and all its descendants, in MB"""
+    total_kb = 0
+    for child in _children(pid):
+        try:
+            for line in (PROC / str(child) / "status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total_kb += int(line.split()[1])
+                    break
+        except OSError:
+            continue  # Exited between listing and reading
+    return total_kb / 1024
+
+
+def _kill_group(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def run_with_rss_limit(cmd, limit_mb=None, timeout=None, **popen_kwargs):
+    """
+    Run `cmd`, killing it if its process tree exceeds `limit_mb` or runs longer
+    than `timeout` seconds.
+    Returns (returncode, peak_mb, killed); killed is False, "rss" or "timeout",
+    peak_mb is None where /proc is unavailable.
+    """
+    process = subprocess.Popen(cmd, start_new_session=True, **popen_kwargs)
+    if not PROC.exists():
+        try:
+            process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _kill_group(process)
+            process.communicate()
+            return process.returncode, None, "timeout"
+        return process.returncode, None, False
+
+    peak_mb = 0.0
+    killed = False
+    deadline = time.monotonic() + timeout if timeout else None
+    result = {}
+    waiter = threading.Thread(target=lambda: result.update(out=process.communicate()), daemon=True)
+    waiter.start()
+    while waiter.is_alive():
+        peak_mb = max(peak_mb, tree_rss_mb(process.pid))
+        if not killed and limit_mb and peak_mb > limit_mb:
+            killed = "rss"
+            _kill_group(process)
+        elif not killed and deadline and time.monotonic() > deadline:
+            killed = "timeout"
+            _kill_group(process)
+        waiter.join(SAMPLE_INTERVAL)
+    return process.returncode, peak_mb, killed
+
+
+def available_memory_mb():
+    """MemAvailable from /proc/meminfo, or None where that is not available"""
+    try:
+        with open(PROC / "meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+
+class MemoryBudget:
+    """
+    Admission control for concurrent renders. A render is admitted while its
+    estimated peak fits in what is left of the budget; one render is always
+    admitted so a scene bigger than the whole budget still gets to run alone.
+    """
+
+    def __init__(self, budget_mb=None):
+        self.budget_mb = budget_mb
+        self.reserved_mb = 0
+        self.running = 0
+        self.changed = threading.Condition()
+
+    def fits(self, mb):
+        return self.running == 0 or self.budget_mb is None or self.reserved_mb + mb <= self.budget_mb
+
+    def try_acquire(self, mb):
+        with self.changed:
+            if not self.fits(mb):
+                return False
+            self.reserved_mb += mb
+            self.running += 1
+            return True
+
+    def acquire(self, mb):
+        with self.changed:
+            while not self.fits(mb):
+                self.changed.wait()
+            self.reserved_mb += mb
+            self.running += 1
+
+    def release(self, mb):
+        with self.changed:
+            self.reserved_mb -= mb
+            self.running -= 1
+            self.changed.notify_all()
+
+
+def estimate_mb(history, key, default_mb):
+    """Memory to reserve for a scene: its padded historical peak, else the default"""
+    peak = history.get(key, "peak_rss_mb")
+    return peak * PEAK_MARGIN if peak else default_mb
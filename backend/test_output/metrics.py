@@ -0,0 +1,160 @@
+"""
+Pipeline metrics in OpenMetrics text format
+Process-wide counters and histograms for the lecture pipeline, exported as
+an OpenMetrics textfile (for node_exporter's textfile collector) and/or on
+a local HTTP endpoint (GET /metrics). No client library is needed.
+
+Cache hit ratios come from lecture_cache_lookups_total, for example:
+    sum by (cache) (rate(lecture_cache_lookups_total{result="hit"}[1h]))
+      / sum by (cache) (rate(lecture_cache_lookups_total[1h]))
+"""
+import atexit
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+TEXTFILE_INTERVAL = 15
+
+_registry = []
+_lock = threading.Lock()
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        yield f"# TYPE {self.name} counter"
+        yield f"# HELP {self.name} {self.help}"
+        for key, value in sorted(self.values.items()):
+            yield f"{self.name}_total{_label_text(self.labels, key)} {_number(value)}"
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, labels=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.labels = tuple(labels)
+        self.values = {}  # labels -> [bucket counts..., +Inf count, sum]
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with _lock:
+            counts = self.values.setdefault(key, [0] * (len(self.buckets) + 2))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def samples(self):
+        yield f"# TYPE {self.name} histogram"
+        yield f"# HELP {self.name} {self.help}"
+        for key, counts in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                yield f"{self.name}_bucket{_label_text(self.labels, key, [('le', le)])} {cumulative}"
+            yield f"{self.name}_count{_label_text(self.labels, key)} {cumulative}"
+            yield f"{self.name}_sum{_label_text(self.labels, key)} {_number(counts[-1])}"
+
+
+TTS_SECONDS = Histogram("lecture_tts_seconds", "edge-tts synthesis latency per narration",
+                        (0.5, 1, 2, 5, 10, 20, 40, 80))
+RENDER_SECONDS = Histogram("lecture_scene_render_seconds", "Wall time of one manim scene render",
+                           (5, 10, 30, 60, 120, 300, 600, 1200), labels=("quality",))
+FRAMES_ENCODED = Counter("lecture_frames_encoded", "Video frames handed to an encoder", labels=("stage",))
+FFMPEG_INVOCATIONS = Counter("lecture_ffmpeg_invocations", "ffmpeg processes started", labels=("stage",))
+CACHE_LOOKUPS = Counter("lecture_cache_lookups", "Cache and checkpoint lookups by outcome",
+                        labels=("cache", "result"))
+BYTES_WRITTEN = Counter("lecture_bytes_written", "Bytes of finished output files", labels=("kind",))
+BYTES_RECLAIMED = Counter("lecture_bytes_reclaimed", "Bytes of intermediates deleted after use")
+DEGRADED_RENDERS = Counter("lecture_degraded_renders", "Scene renders that stepped down the quality ladder",
+                           labels=("step",))
+
+
+def cache_lookup(cache, hit):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def render():
+    """The whole registry in OpenMetrics text exposition format"""
+    with _lock:
+        lines = [line for metric in _registry for line in metric.samples()]
+    return "\n".join(lines + ["# EOF"]) + "\n"
+
+
+def write_textfile(path):
+    """Atomically (re)write the textfile so a collector never reads half of it"""
+    path = Path(path)
+    temp = path.with_name(path.name + ".tmp")
+    temp.write_text(render(), encoding="utf-8")
+    os.replace(temp, path)
+
+
+def start_textfile_writer(path, interval=TEXTFILE_INTERVAL):
+    """Rewrite `path` every `interval` seconds and once more at exit"""
+    def loop():
+        while True:
+            time.sleep(interval)
+            write_textfile(path)
+
+    threading.Thread(target=loop, daemon=True).start()
+    atexit.register(write_textfile, path)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    """Serve GET /metrics from a background thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,167 @@
+"""
+Sentence-chunked narration synthesis
+A narration is split at sentence boundaries and the sentences are sent to
+edge-tts concurrently, so a long slide takes about as long as its longest
+sentence instead of the sum of all of them. Every sentence is decoded to
+PCM with its leading/trailing silence trimmed and cached on its own (keyed
+by voice, rate and text): editing one sentence re-synthesizes only that
+sentence. The chunks are stitched with the wave module, with pauses of an
+exact number of samples between sentences, and encoded to MP3 once.
+
+Run with: python narration_chunks.py "First sentence. Second one!" -o narration.mp3
+"""
+import argparse
+import asyncio
+import hashlib
+import re
+import subprocess
+import uuid
+import wave
+from pathlib import Path
+
+import metrics
+from checkpoint import atomic_output, produced
+from generate_ai_audio import RATE, VOICE, synthesize, tts_offline
+
+CACHE_DIR = Path("tts_cache")
+SAMPLE_RATE = 24000  # edge-tts native rate
+CONCURRENCY = 4
+# Short sentences are merged with the next one; tiny requests cost more than they save
+MIN_CHUNK_CHARS = 60
+# Pause inserted after a chunk, by its closing punctuation
+PAUSES = {".": 0.35, "!": 0.4, "?": 0.45}
+DEFAULT_PAUSE = 0.3
+# Trim edge silence below this level so the inserted pauses are the only ones
+SILENCE_THRESHOLD = "-50dB"
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])")
+
+
+def split_sentences(text):
+    """Sentence chunks of `text`, merging ones shorter than MIN_CHUNK_CHARS into the next"""
+    sentences = [s.strip() for s in _SENTENCE_END.split(text.strip()) if s.strip()]
+    chunks = []
+    pending = ""
+    for sentence in sentences:
+        pending = f"{pending} {sentence}".strip()
+        if len(pending) >= MIN_CHUNK_CHARS:
+            chunks.append(pending)
+            pending = ""
+    if pending:
+        if chunks and len(pending) < MIN_CHUNK_CHARS:
+            chunks[-1] = f"{chunks[-1]} {pending}"
+        else:
+            chunks.append(pending)
+    return chunks
+
+
+def pause_after(chunk):
+    return PAUSES.get(chunk.rstrip("\"')] ")[-1:], DEFAULT_PAUSE)
+
+
+def chunk_path(text, voice, rate, cache_dir=CACHE_DIR):
+    if tts_offline():
+        cache_dir = Path(cache_dir) / "offline"  # Never mix placeholder silence into the real cache
+    key = hashlib.sha256("|".join((voice, rate, text)).encode("utf-8")).hexdigest()[:24]
+    return Path(cache_dir) / f"{key}.wav"
+
+
+def _decode_trimmed(mp3_file, wav_file):
+    """Decode to mono 16-bit PCM at SAMPLE_RATE with leading and trailing silence removed"""
+    trim = f"silenceremove=start_periods=1:start_threshold={SILENCE_THRESHOLD}"
+    # Offline placeholders are all silence - trimming would leave nothing
+    filters = [] if tts_offline() else ["-af", f"{trim},areverse,{trim},areverse"]
+    metrics.FFMPEG_INVOCATIONS.inc(stage="tts_decode")
+    return subprocess.run([
+        "ffmpeg", "-y",
+        "-i", str(mp3_file),
+        *filters,
+        "-ac", "1", "-ar", str(SAMPLE_RATE), "-c:a", "pcm_s16le",
+        str(wav_file)
+    ], capture_output=True)
+
+
+async def synthesize_chunk(text, voice, rate, semaphore, cache_dir=CACHE_DIR):
+    """Cached PCM of one chunk, synthesizing it if needed; returns its path or None"""
+    wav_file = chunk_path(text, voice, rate, cache_dir)
+    metrics.cache_lookup("tts_chunk", wav_file.exists())
+    if wav_file.exists():
+        return wav_file
+    wav_file.parent.mkdir(parents=True, exist_ok=True)
+    # Other slides may synthesize the same sentence at the same time: keep the temp files apart
+    mp3_file = wav_file.with_name(f"{wav_file.stem}.{uuid.uuid4().hex[:8]}.mp3")
+    async with semaphore:
+        with atomic_output(mp3_file) as output:
+            output.ok = ok = await synthesize(text, output.path, voice, rate) and produced(output.path)
+    if not ok:
+        return None
+    with atomic_output(wav_file, shared=True) as output:
+        result = await asyncio.to_thread(_decode_trimmed, mp3_file, output.path)
+        output.ok = ok = result.returncode == 0 and produced(output.path)
+    mp3_file.unlink(missing_ok=True)
+    return wav_file if ok else None
+
+
+def stitch(chunks, wav_output):
+    """Join (wav_path, pause_seconds) chunks into one WAV, pauses counted in samples"""
+    with wave.open(str(wav_output), "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(SAMPLE_RATE)
+        for i, (wav_file, pause) in enumerate(chunks):
+            with wave.open(str(wav_file), "rb") as chunk:
+                out.writeframes(chunk.readframes(chunk.getnframes()))
+            if i < len(chunks) - 1:
+                out.writeframes(b"\0\0" * round(pause * SAMPLE_RATE))
+
+
+async def synthesize_chunked(text, output_file, voice=VOICE, rate=RATE, concurrency=CONCURRENCY,
+                             cache_dir=CACHE_DIR):
+    """Synthesize `text` sentence by sentence in parallel into one MP3; True if it was written"""
+    chunks = split_sentences(text)
+    if not chunks:
+        return False
+    semaphore = asyncio.Semaphore(concurrency)
+    # A repeated sentence is synthesized once: concurrent writers would share its temp file
+    unique = list(dict.fromkeys(chunks))
+    synthesized = await asyncio.gather(*(synthesize_chunk(chunk, voice, rate, semaphore, cache_dir)
+                                         for chunk in unique))
+    if not all(synthesized):
+        return False
+    wav_by_chunk = dict(zip(unique, synthesized))
+    wav_files = [wav_by_chunk[chunk] for chunk in chunks]
+
+    output_file = Path(output_file)
+    stitched = output_file.with_name(f"{output_file.stem}_stitched.wav")
+    stitch([(wav, pause_after(chunk)) for wav, chunk in zip(wav_files, chunks)], stitched)
+    metrics.FFMPEG_INVOCATIONS.inc(stage="tts_encode")
+    with atomic_output(output_file) as output:
+        result = subprocess.run([
+            "ffmpeg", "-y",
+            "-i", str(stitched),
+            "-c:a", "libmp3lame", "-q:a", "2",
+            str(output.path)
+        ], capture_output=True)
+        output.ok = ok = result.returncode == 0 and produced(output.path)
+    stitched.unlink(missing_ok=True)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthesize a narration sentence by sentence")
+    parser.add_argument("text", help="narration text")
+    parser.add_argument("-o", "--output", required=True, help="MP3 path")
+    parser.add_argument("--voice", default=VOICE)
+    parser.add_argument("--rate", default=RATE)
+    args = parser.parse_args()
+
+    chunks = split_sentences(args.text)
+    print(f"Synthesizing {len(chunks)} chunks...")
+    if asyncio.run(synthesize_chunked(args.text, args.output, args.voice, args.rate)):
+        print(f"✓ {args.output}")
+    else:
+        print("✗ Synthesis failed")
+
+
+if __name__ == "__main__":
+    main()
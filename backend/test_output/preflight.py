@@ -0,0 +1,156 @@
+"""
+Stream-parameter preflight for the final concat
+`-f concat -c copy` only produces a valid file when every segment has the
+same codecs, resolution, pixel format, frame rate, timebase and audio
+layout, and when each segment's audio ends exactly where its video does.
+The preflight probes every segment once, takes the most common parameter
+set among the highest-resolution segments as the target (so a slide that
+went down the degradation ladder is scaled up to the full-quality size, not
+the other way round), re-encodes only the outliers and re-muxes segments
+whose audio drifts from the video by more than half a frame, so the join
+itself is always a pure stream copy.
+"""
+import json
+import subprocess
+from collections import Counter
+from pathlib import Path
+
+import metrics
+from checkpoint import atomic_output, produced
+from encoding_profiles import DEFAULT_PROFILE, audio_args, video_args
+
+VIDEO_KEYS = ("codec_name", "width", "height", "pix_fmt", "r_frame_rate", "time_base")
+AUDIO_KEYS = ("codec_name", "sample_rate", "channels", "channel_layout")
+
+
+class PreflightError(RuntimeError):
+    pass
+
+
+def probe_segment(path):
+    """All stream parameters and durations of one segment from a single ffprobe call"""
+    result = subprocess.run([
+        "ffprobe", "-v", "error",
+        "-show_entries", "stream=" + ",".join(sorted(set(VIDEO_KEYS + AUDIO_KEYS) | {"codec_type", "duration"})),
+        "-of", "json",
+        str(path)
+    ], capture_output=True, text=True)
+    try:
+        streams = json.loads(result.stdout)["streams"]
+    except (ValueError, KeyError):
+        raise PreflightError(f"could not probe {path}")
+
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    if video is None or audio is None:
+        raise PreflightError(f"{path} needs one video and one audio stream")
+    return {
+        "path": Path(path),
+        "video": tuple(video.get(key) for key in VIDEO_KEYS),
+        "audio": tuple(audio.get(key) for key in AUDIO_KEYS),
+        "video_duration": float(video.get("duration", 0)),
+        "audio_duration": float(audio.get("duration", 0)),
+    }
+
+
+def _rate(fraction):
+    num, _, den = str(fraction).partition("/")
+    return float(num) / float(den or 1)
+
+
+def _pixels(video):
+    params = dict(zip(VIDEO_KEYS, video))
+    return (params["width"] or 0) * (params["height"] or 0)
+
+
+def _normalize(info, target_video, target_audio, output_file, profile):
+    """Re-encode an outlier segment to the target parameters with frame-exact audio; True on success"""
+    params = dict(zip(VIDEO_KEYS, target_video))
+    audio = dict(zip(AUDIO_KEYS, target_audio))
+    fps = _rate(params["r_frame_rate"])
+    duration = round(info["video_duration"] * fps) / fps
+    timescale = str(params["time_base"]).partition("/")[2] or "12800"
+
+    metrics.FFMPEG_INVOCATIONS.inc(stage="normalize")
+    metrics.FRAMES_ENCODED.inc(round(duration * fps), stage="normalize")
+    with atomic_output(output_file) as output:
+        result = subprocess.run([
+            "ffmpeg", "-y",
+            "-i", str(info["path"]),
+            "-vf", f"fps={params['r_frame_rate']},scale={params['width']}:{params['height']},"
+                   f"format={params['pix_fmt']}",
+            "-af", f"aresample={audio['sample_rate']},apad,atrim=end={duration:.6f}",
+            *video_args(profile, fps),
+            *audio_args(profile),
+            "-ar", str(audio["sample_rate"]),
+            "-ac", str(audio["channels"]),
+            "-t", f"{duration:.6f}",
+            "-video_track_timescale", timescale,
+            str(output.path)
+        ], capture_output=True)
+        output.ok = result.returncode == 0 and produced(output.path)
+    return output.ok
+
+
+def _realign_audio(info, target_audio, output_file, profile):
+    """Copy the video and pad/trim only the audio to the video's exact length; True on success"""
+    audio = dict(zip(AUDIO_KEYS, target_audio))
+    duration = info["video_duration"]
+    metrics.FFMPEG_INVOCATIONS.inc(stage="realign")
+    with atomic_output(output_file) as output:
+        result = subprocess.run([
+            "ffmpeg", "-y",
+            "-i", str(info["path"]),
+            "-map", "0:v:0", "-map", "0:a:0",
+            "-c:v", "copy",
+            "-af", f"apad,atrim=end={duration:.6f}",
+            *audio_args(profile),
+            "-ar", str(audio["sample_rate"]),
+            "-ac", str(audio["channels"]),
+            str(output.path)
+        ], capture_output=True)
+        output.ok = result.returncode == 0 and produced(output.path)
+    return output.ok
+
+
+def _fit(info, target_video, target_audio, profile):
+    """Path of the segment, or of a fixed copy, with the target parameters and aligned audio"""
+    path = info["path"]
+    half_frame = 0.5 / _rate(dict(zip(VIDEO_KEYS, target_video))["r_frame_rate"])
+    fixed = path.with_name(f"{path.stem}_norm{path.suffix}")
+    if info["video"] != target_video or info["audio"] != target_audio:
+        print(f"  ⚙ Normalizing {path.name} to match the other segments")
+        ok = _normalize(info, target_video, target_audio, fixed, profile)
+    elif abs(info["audio_duration"] - info["video_duration"]) > half_frame:
+        print(f"  ⚙ Re-aligning audio of {path.name} "
+              f"({info['audio_duration'] - info['video_duration']:+.3f}s)")
+        ok = _realign_audio(info, target_audio, fixed, profile)
+    else:
+        return path
+
+    if not ok:
+        raise PreflightError(f"could not normalize {path}")
+    check = probe_segment(fixed)
+    if check["video"] != target_video or check["audio"] != target_audio:
+        raise PreflightError(f"{fixed} still differs from the target stream parameters")
+    return fixed
+
+
+def preflight(segments, profile=DEFAULT_PROFILE):
+    """
+    Return segments that are safe to join with `-c copy`.
+    Matching segments are returned as-is; outliers are replaced by a
+    normalized copy written next to them (`<name>_norm.mp4`).
+    """
+    infos = [probe_segment(path) for path in segments]
+    counts = Counter(info["video"] for info in infos)
+    # Degraded renders are smaller than the profile's size; they must not drag the others down
+    target_video = max(counts, key=lambda video: (_pixels(video), counts[video]))
+    target_audio = Counter(info["audio"] for info in infos).most_common(1)[0][0]
+    return [_fit(info, target_video, target_audio, profile) for info in infos]
+
+
+def match_segment(segment, reference, profile=DEFAULT_PROFILE):
+    """Return `segment`, or a normalized copy of it, that can be stream-copied into `reference`"""
+    target = probe_segment(reference)
+    return _fit(probe_segment(segment), target["video"], target["audio"], profile)
@@ -0,0 +1,207 @@
+"""
+Machine-readable progress stream
+Newline-delimited JSON progress events for callers (the JS service, CI) that
+need exact progress instead of parsing print output or polling the disk.
+Enabled with --progress TARGET on the pipeline CLIs, or LECTURE_PROGRESS:
+
+    fd:3                 an inherited file descriptor, e.g. a pipe from the caller
+    unix:/tmp/p.sock     a Unix stream socket
+    tcp:127.0.0.1:9000   a TCP socket
+    anything else        a file, appended to
+
+Manim renders run in child processes that inherit the setting and report
+their own frames (over a socket every process opens its own connection).
+Every event carries "event" and "ts":
+
+    stage    stage (tts, render, sync, concat, assemble), state (start, done,
+             failed), lecture, slide, seconds and bytes once finished
+    frames   stage (render, sync, one_pass), frames, total_frames, fps,
+             bytes, eta_s, plus lecture/slide/scene where known
+    batch    done, total, running, queued, eta_s
+    job      the render server's job status events, with state, job, lecture
+"""
+import json
+import os
+import socket
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+PROGRESS_ENV = "LECTURE_PROGRESS"
+# JSON fields a parent hands to the events of a child process (slide, scene, total_frames)
+CONTEXT_ENV = "LECTURE_PROGRESS_CONTEXT"
+# frames events per stage are sent at most this often
+MIN_INTERVAL = 0.5
+
+_lock = threading.Lock()
+_write = None
+_fd = None
+_local = threading.local()
+
+
+def configure(target):
+    """Send events to `target` (see module docstring); child processes inherit it"""
+    global _write, _fd
+    if target.startswith("fd:"):
+        _fd = int(target[3:])
+
+        def write(data):
+            while data:
+                data = data[os.write(_fd, data):]
+        _write = write
+    elif target.startswith("unix:"):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(target[5:])
+        _write = sock.sendall
+    elif target.startswith("tcp:"):
+        host, _, port = target[4:].rpartition(":")
+        _write = socket.create_connection((host, int(port))).sendall
+    else:
+        stream = open(target, "ab", buffering=0)  # One write() per line keeps lines whole
+        _write = stream.write
+    os.environ[PROGRESS_ENV] = target
+
+
+def enabled():
+    return _write is not None
+
+
+def emit(event, **fields):
+    """Write one event; a reader that went away only disables the stream"""
+    global _write
+    if _write is None:
+        return
+    record = {"event": event, "ts": round(time.time(), 3), **getattr(_local, "context", {}), **fields}
+    data = (json.dumps(record, default=str) + "\n").encode("utf-8")
+    with _lock:
+        try:
+            _write(data)
+        except OSError:
+            _write = None
+
+
+@contextmanager
+def context(**fields):
+    """Add `fields` to every event emitted by this thread inside the block"""
+    previous = getattr(_local, "context", {})
+    _local.context = {**previous, **fields}
+    try:
+        yield
+    finally:
+        _local.context = previous
+
+
+@contextmanager
+def stage(name, **fields):
+    """
+    Emit start and done/failed events around a pipeline stage. The block may
+    set outcome["failed"] = True or add fields (bytes, ...) to the done event.
+    """
+    emit("stage", stage=name, state="start", **fields)
+    start = time.monotonic()
+    outcome = {}
+    try:
+        yield outcome
+    except Exception:
+        emit("stage", stage=name, state="failed", seconds=round(time.monotonic() - start, 3), **fields)
+        raise
+    state = "failed" if outcome.pop("failed", False) else "done"
+    emit("stage", stage=name, state=state, seconds=round(time.monotonic() - start, 3), **fields, **outcome)
+
+
+class FrameReporter:
+    """Throttled frames events for one stage: frames out of total, fps, bytes and ETA"""
+
+    def __init__(self, stage, total_frames=None, **fields):
+        self.stage = stage
+        self.total_frames = total_frames
+        self.fields = fields
+        self.start = time.monotonic()
+        self.last = 0.0
+
+    def due(self):
+        """Whether update() would send an event now (lets callers skip measuring bytes)"""
+        return _write is not None and time.monotonic() - self.last >= MIN_INTERVAL
+
+    def update(self, frames, bytes_written=None, fps=None, force=False):
+        if _write is None or not (force or self.due()):
+            return
+        now = time.monotonic()
+        self.last = now
+        elapsed = now - self.start
+        fps = fps or (frames / elapsed if elapsed else 0.0)
+        eta = None
+        if self.total_frames and fps:
+            eta = round(max(0, self.total_frames - frames) / fps, 1)
+        emit("frames", stage=self.stage, frames=frames, total_frames=self.total_frames, fps=round(fps, 1),
+             bytes=bytes_written, eta_s=eta, **self.fields)
+
+
+def child_env(env=None, **fields):
+    """Environment for a child process that reports frames with this thread's context plus `fields`"""
+    env = dict(os.environ if env is None else env)
+    if _write is not None:
+        env[CONTEXT_ENV] = json.dumps({**getattr(_local, "context", {}), **fields}, default=str)
+    return env
+
+
+def pass_fds():
+    """Descriptors a child must inherit to write to the stream (Popen pass_fds)"""
+    return (_fd,) if _fd is not None else ()
+
+
+def _number(value, kind):
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def run_ffmpeg(cmd, stage, total_frames=None, **fields):
+    """
+    subprocess.run(cmd, capture_output=True) for an ffmpeg command; with the
+    stream enabled, ffmpeg's -progress output is reported as frames events.
+    """
+    if _write is None:
+        return subprocess.run(cmd, capture_output=True)
+    cmd = [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr = []
+    reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+    reader.start()
+    reporter = FrameReporter(stage, total_frames, **fields)
+    values = {}
+    for line in process.stdout:
+        key, _, value = line.decode("utf-8", "replace").strip().partition("=")
+        values[key] = value
+        if key == "progress":
+            reporter.update(_number(values.get("frame"), int) or 0, _number(values.get("total_size"), int),
+                            _number(values.get("fps"), float), force=value == "end")
+    process.wait()
+    reader.join()
+    return subprocess.CompletedProcess(cmd, process.returncode, b"", stderr[0] if stderr else b"")
+
+
+def install_frame_hook():
+    """Child side: report the frames manim's SceneFileWriter writes, with the parent's context"""
+    from manim.scene.scene_file_writer import SceneFileWriter
+
+    fields = json.loads(os.environ.get(CONTEXT_ENV) or "{}")
+    reporter = FrameReporter("render", fields.pop("total_frames", None), **fields)
+    original_write_frame = SceneFileWriter.write_frame
+    written = [0]
+
+    def write_frame(self, frame_or_renderer, num_frames=1):
+        original_write_frame(self, frame_or_renderer, num_frames)
+        written[0] += num_frames
+        reporter.update(written[0])
+
+    SceneFileWriter.write_frame = write_frame
+
+
+if os.environ.get(PROGRESS_ENV) and _write is None:
+    try:
+        configure(os.environ[PROGRESS_ENV])
+    except (OSError, ValueError):
+        pass  # Inherited target not reachable from here - run without progress
@@ -0,0 +1,130 @@
+"""
+Render time budgets with a degradation ladder
+A scene may take at most the per-scene budget, and no longer than what is
+left of its lecture's budget (minus a reserve for sync and concat). When
+the cost model predicts that a scene will not fit, or a render runs out of
+time, the scene is rendered one step further down the ladder:
+
+    full               the profile's manim quality at the scene's frame rate
+    lower_resolution   the next lower manim quality flag
+    lower_frame_rate   lower resolution at DEGRADED_FRAME_RATE
+    still              the scene's final frame only (animations skipped),
+                       held for the whole narration
+
+The still step always runs, however little time is left, so a lecture is
+always delivered. The step every slide ended on is recorded in the slide
+manifest, the lecture's .slides.json index and lecture_degraded_renders_total;
+degraded slides are rendered at full quality again on the next build.
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import metrics
+from encoding_profiles import PROFILES, manim_args, video_args
+from frame_rates import MANIM_MAIN, quality_env
+from memory_guard import run_with_rss_limit
+from render_cost import PROFILE_SCALE
+
+FULL = "full"
+STILL = "still"
+# Manim quality flags from highest to lowest
+QUALITY_FLAGS = ["-qk", "-qp", "-qh", "-qm", "-ql"]
+DEGRADED_FRAME_RATE = 8
+# Seconds of a lecture budget kept back for syncing and concatenating its slides
+ASSEMBLY_RESERVE = 30
+# A still frame only runs construct() with animations skipped
+STILL_SECONDS = 15
+STILL_TIMEOUT = 120
+# Render cost of each quality flag relative to the web profile
+QUALITY_SCALE = {PROFILES[name]["manim_quality"]: scale for name, scale in PROFILE_SCALE.items()}
+
+
+class RenderBudget:
+    """Per-scene and per-lecture time limits, in seconds; None means unlimited"""
+
+    def __init__(self, scene_seconds=None, lecture_seconds=None):
+        self.scene_seconds = scene_seconds
+        self.lecture_seconds = lecture_seconds
+        self.deadlines = {}
+        self.lock = threading.Lock()
+
+    def start(self, lecture):
+        """Start (or restart) the clock of a lecture, e.g. when it is submitted"""
+        if self.lecture_seconds:
+            with self.lock:
+                self.deadlines[lecture] = time.monotonic() + self.lecture_seconds
+
+    def allowed(self, lecture):
+        """Seconds a scene of `lecture` may still take from now, or None without limits"""
+        limits = [self.scene_seconds] if self.scene_seconds else []
+        if self.lecture_seconds:
+            with self.lock:
+                deadline = self.deadlines.setdefault(lecture, time.monotonic() + self.lecture_seconds)
+            limits.append(deadline - time.monotonic() - ASSEMBLY_RESERVE)
+        return max(0.0, min(limits)) if limits else None
+
+
+def ladder(profile, frame_rate=None):
+    """[(step, manim quality flag, frame rate)] from full quality down to a still frame"""
+    quality = manim_args(profile)[0]
+    steps = [(FULL, quality, frame_rate)]
+    position = QUALITY_FLAGS.index(quality) if quality in QUALITY_FLAGS else len(QUALITY_FLAGS) - 1
+    lower = QUALITY_FLAGS[min(position + 1, len(QUALITY_FLAGS) - 1)]
+    if lower != quality:
+        steps.append(("lower_resolution", lower, frame_rate))
+    if frame_rate is None or frame_rate > DEGRADED_FRAME_RATE:
+        steps.append(("lower_frame_rate", lower, DEGRADED_FRAME_RATE))
+    steps.append((STILL, quality, frame_rate))  # One frame is cheap at any resolution
+    return steps
+
+
+def predicted_seconds(full_seconds, steps, index):
+    """Predicted render time of ladder step `index`, scaled from the full-quality prediction"""
+    step, quality, frame_rate = steps[index]
+    if step == STILL:
+        return STILL_SECONDS
+    _, full_quality, full_rate = steps[0]
+    scale = QUALITY_SCALE.get(quality, 1.0) / QUALITY_SCALE.get(full_quality, 1.0)
+    if frame_rate and full_rate:
+        scale *= frame_rate / full_rate
+    return full_seconds * scale
+
+
+def first_step(full_seconds, steps, allowed):
+    """Index of the best step predicted to fit in `allowed` seconds (the still step if none does)"""
+    if allowed is None:
+        return 0
+    for index in range(len(steps) - 1):
+        if predicted_seconds(full_seconds, steps, index) <= allowed:
+            return index
+    return len(steps) - 1
+
+
+def render_still(manim_file, scene, media_dir, quality, fps, profile, rss_limit_mb=None, timeout=STILL_TIMEOUT):
+    """Render only the last frame of `scene` and wrap it in a one-second MP4 (sync holds it)"""
+    returncode, _, killed = run_with_rss_limit([
+        sys.executable, "-c", MANIM_MAIN, "render", quality, "-s",
+        str(manim_file), scene, "--media_dir", str(media_dir)
+    ], rss_limit_mb, timeout, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env=quality_env(dict(os.environ), quality))
+    if killed or returncode != 0:
+        return None
+    images = sorted((Path(media_dir) / "images" / Path(manim_file).stem).glob(f"{scene}*.png"))
+    if not images:
+        return None
+
+    video_file = Path(media_dir) / f"{scene}_still.mp4"
+    metrics.FFMPEG_INVOCATIONS.inc(stage="still")
+    result = subprocess.run([
+        "ffmpeg", "-y",
+        "-loop", "1", "-framerate", f"{fps:g}", "-i", str(images[-1]),
+        "-t", "1",
+        "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+        *video_args(profile, fps),
+        str(video_file)
+    ], capture_output=True)
+    return video_file if result.returncode == 0 else None
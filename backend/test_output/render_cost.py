@@ -0,0 +1,204 @@
+"""
+Scene render cost model
+Predicts how many seconds `manim render` will take for a scene, so the batch
+scheduler can start the longest slides first and report honest ETAs.
+
+Static features come from the scene source (no manim import):
+    animated seconds   run_time of every play() (1s when not given)
+    wait seconds       total of every wait()
+    plays              play()/wait() calls (one partial movie file each)
+    loop mobjects      mobjects constructed inside loops and comprehensions
+    texts              Text/MathTex/... objects (each one is a Pango/LaTeX run)
+Calls inside loops count once per (estimated) iteration.
+
+A scene whose source is unchanged since its last render is predicted from
+its recorded render time. Otherwise a linear model over the features is used,
+refitted per profile from render history once enough scenes were timed.
+
+Run with: python render_cost.py ml_video_extended.py --profile web
+"""
+import argparse
+import ast
+import hashlib
+from pathlib import Path
+
+from duration_model import fit
+from encoding_profiles import DEFAULT_PROFILE, PROFILES
+from render_history import RenderHistory, scene_key
+
+TEXT_CLASSES = {"Text", "MarkupText", "Paragraph", "MathTex", "Tex", "Title", "BulletedList", "Code"}
+# Capitalized calls that build animations, not mobjects
+ANIMATION_CLASSES = {
+    "AnimationGroup", "Succession", "LaggedStart", "Write", "Unwrite", "Create", "Uncreate", "DrawBorderThenFill",
+    "FadeIn", "FadeOut", "Transform", "ReplacementTransform", "TransformFromCopy", "GrowFromCenter",
+    "GrowFromPoint", "GrowArrow", "Indicate", "Circumscribe", "Flash", "Wiggle", "ShowPassingFlash",
+    "Rotate", "Rotating", "SpinInFromNothing", "MoveAlongPath", "ApplyMethod", "Wait", "AddTextLetterByLetter",
+}
+# Iterations assumed for loops whose length cannot be read from the source
+DEFAULT_LOOP_ITERATIONS = 5
+# Seconds per [animated s, wait s, play, loop mobject, text, 1] at the web profile
+DEFAULT_COEFFICIENTS = [1.5, 0.15, 0.3, 0.05, 0.3, 4.0]
+# Frame cost relative to web (pixels x frame rate of the manim quality flag)
+PROFILE_SCALE = {"draft": 0.25, "web": 1.0, "archive": 4.5}
+MIN_SAMPLES = 8
+
+
+def _number(node, default):
+    try:
+        value = ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return default
+    return float(value) if isinstance(value, (int, float)) else default
+
+
+def _iterations(node):
+    """Best guess at how often a for loop / comprehension body runs"""
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        return len(node.elts)
+    if isinstance(node, ast.Call) and getattr(node.func, "id", None) == "range" and node.args:
+        args = [_number(arg, None) for arg in node.args]
+        if None not in args:
+            start, stop = (0, args[0]) if len(args) == 1 else args[:2]
+            step = args[2] if len(args) > 2 else 1
+            return max(0, int((stop - start) / step)) if step else 0
+    if isinstance(node, ast.Call) and getattr(node.func, "id", None) in ("enumerate", "zip") and node.args:
+        return _iterations(node.args[0])
+    return DEFAULT_LOOP_ITERATIONS
+
+
+class _FeatureVisitor(ast.NodeVisitor):
+    def __init__(self):
+        self.animated = 0.0
+        self.waits = 0.0
+        self.plays = 0
+        self.loop_mobjects = 0
+        self.texts = 0
+        self.repeat = 1
+
+    def _loop(self, iterations, body):
+        outer = self.repeat
+        self.repeat *= iterations
+        for node in body:
+            self.visit(node)
+        self.repeat = outer
+
+    def visit_For(self, node):
+        self.visit(node.iter)
+        self._loop(_iterations(node.iter), node.body)
+        for child in node.orelse:
+            self.visit(child)
+
+    def visit_While(self, node):
+        self._loop(DEFAULT_LOOP_ITERATIONS, node.body)
+
+    def _comprehension(self, node, *parts):
+        iterations = 1
+        for generator in node.generators:
+            self.visit(generator.iter)
+            iterations *= _iterations(generator.iter)
+        self._loop(iterations, parts)
+
+    def visit_ListComp(self, node):
+        self._comprehension(node, node.elt)
+
+    visit_SetComp = visit_GeneratorExp = visit_ListComp
+
+    def visit_DictComp(self, node):
+        self._comprehension(node, node.key, node.value)
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Attribute) and getattr(func.value, "id", None) == "self":
+            if func.attr == "play":
+                keywords = {kw.arg: kw.value for kw in node.keywords}
+                run_time = _number(keywords["run_time"], 1.0) if "run_time" in keywords else 1.0
+                self.animated += run_time * self.repeat
+                self.plays += self.repeat
+            elif func.attr == "wait":
+                duration = _number(node.args[0], 1.0) if node.args else 1.0
+                self.waits += duration * self.repeat
+                self.plays += self.repeat
+        name = func.id if isinstance(func, ast.Name) else None
+        if name in TEXT_CLASSES:
+            self.texts += self.repeat
+        if name and name[0].isupper() and name not in ANIMATION_CLASSES and self.repeat > 1:
+            self.loop_mobjects += self.repeat
+        self.generic_visit(node)
+
+
+def _scene_class(manim_file, scene):
+    source = Path(manim_file).read_text(encoding="utf-8")
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.ClassDef) and node.name == scene:
+            return node, ast.get_source_segment(source, node)
+    raise ValueError(f"{scene} not found in {manim_file}")
+
+
+def scene_features(manim_file, scene):
+    """[animated s, wait s, plays, loop mobjects, texts, 1] of a scene's source"""
+    node, _ = _scene_class(manim_file, scene)
+    visitor = _FeatureVisitor()
+    visitor.visit(node)
+    return [visitor.animated, visitor.waits, visitor.plays, visitor.loop_mobjects, visitor.texts, 1]
+
+
+def source_hash(manim_file, scene):
+    """Fingerprint of one scene class, so edits elsewhere in the file keep its timing"""
+    _, source = _scene_class(manim_file, scene)
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+
+def coefficients(history, profile):
+    """Model fitted on every timed scene of this profile, or the scaled defaults"""
+    samples = [
+        entry["features"] + [entry["render_seconds"]]
+        for key, entry in history.data.items()
+        if key.endswith(f":{profile}") and "features" in entry and "render_seconds" in entry
+    ]
+    if len(samples) >= MIN_SAMPLES:
+        fitted = fit(samples)
+        if fitted is not None:
+            return fitted
+    return [c * PROFILE_SCALE.get(profile, 1.0) for c in DEFAULT_COEFFICIENTS]
+
+
+def predict(manim_file, scene, profile=DEFAULT_PROFILE, history=None):
+    """Predicted render seconds of a scene"""
+    history = history if history is not None else RenderHistory()
+    key = scene_key(manim_file, scene, profile)
+    recorded = history.get(key, "render_seconds")
+    if recorded is not None and history.get(key, "source_hash") == source_hash(manim_file, scene):
+        return recorded
+    features = scene_features(manim_file, scene)
+    return max(1.0, sum(c * x for c, x in zip(coefficients(history, profile), features)))
+
+
+def record(history, manim_file, scene, profile, seconds):
+    """Store a finished render's wall time together with the features it is explained by"""
+    history.record(scene_key(manim_file, scene, profile), render_seconds=round(seconds, 2),
+                   features=scene_features(manim_file, scene), source_hash=source_hash(manim_file, scene))
+
+
+def format_eta(seconds):
+    minutes, secs = divmod(int(round(seconds)), 60)
+    return f"{minutes}m{secs:02d}s" if minutes else f"{secs}s"
+
+
+def main():
+    from batch_render import scene_names_in_file
+
+    parser = argparse.ArgumentParser(description="Predict render time of every scene in a Manim file")
+    parser.add_argument("manim_file")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE)
+    args = parser.parse_args()
+
+    history = RenderHistory()
+    costs = [(predict(args.manim_file, scene, args.profile, history), scene)
+             for scene in scene_names_in_file(args.manim_file)]
+    for seconds, scene in sorted(costs, reverse=True):
+        print(f"  {scene:<30} {format_eta(seconds):>8}")
+    print(f"  {'total':<30} {format_eta(sum(seconds for seconds, _ in costs)):>8}")
+
+
+if __name__ == "__main__":
+    main()
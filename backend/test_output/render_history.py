@@ -0,0 +1,77 @@
+"""
+Per-scene render history
+Measurements from past renders (peak memory, render seconds, ...) keyed by
+scene, persisted as JSON so schedulers can plan with real numbers instead
+of guesses.
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+HISTORY_FILE = Path("render_history.json")
+# A peak is the maximum of this many latest samples, so a one-off spike or a
+# scene that has since been slimmed down stops inflating memory reservations
+PEAK_WINDOW = 5
+
+
+def scene_key(manim_file, scene, profile):
+    """History key for a scene; resolution (profile) changes its cost, edits mostly don't"""
+    return f"{Path(manim_file).stem}:{scene}:{profile}"
+
+
+class RenderHistory:
+    """JSON store of per-scene measurements, safe to share between threads and processes"""
+
+    def __init__(self, path=HISTORY_FILE):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.data = self._load()
+
+    def _load(self):
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key, metric, default=None):
+        return self.data.get(key, {}).get(metric, default)
+
+    def record(self, key, **metrics):
+        """Store the latest values; `peak_*` metrics are the maximum of the last PEAK_WINDOW samples"""
+        with self.lock, self._file_lock():
+            # Other processes (batch workers, the server, shard nodes) may have recorded since
+            data = self._load()
+            entry = data.setdefault(key, {})
+            for metric, value in metrics.items():
+                if value is None:
+                    continue
+                if metric.startswith("peak_"):
+                    recent = entry.get(f"{metric}_recent", [])[-(PEAK_WINDOW - 1):] + [value]
+                    entry[f"{metric}_recent"] = recent
+                    value = max(recent)
+                entry[metric] = value
+            entry["samples"] = entry.get("samples", 0) + 1
+            self._save(data)
+            self.data = data
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock around a read-modify-write of the file"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.path.with_name(self.path.name + ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _save(self, data):
+        temp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        temp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        os.replace(temp, self.path)
@@ -0,0 +1,337 @@
+"""
+Local render job server
+Long-running process that owns all expensive pipeline work (manim renders,
+edge-tts, ffmpeg). Lecture scripts are queued by priority, identical slides
+that are already in flight are rendered once and shared by content hash,
+and job status is streamed back as newline-delimited JSON.
+
+API:
+    POST /jobs        {"script": {...} | "scriptPath": "...", "priority": 0, "profile": "web"}
+                      -> {"id": "..."}
+    GET  /jobs        -> list of jobs and their state
+    GET  /jobs/<id>   -> NDJSON status events, streamed until the job finishes
+    GET  /metrics     -> pipeline metrics in OpenMetrics text format
+
+Run with: python render_server.py --port 8765
+      or: python render_server.py --socket /tmp/render.sock
+"""
+import argparse
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import socketserver
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import metrics
+import progress
+from batch_render import DEFAULT_RSS_LIMIT_MB, MEMORY_HEADROOM, expand_lecture, load_lecture, run_slide, \
+    slide_memory_mb, validate_lectures
+from encoding_profiles import DEFAULT_PROFILE, PROFILES, EncodeReport
+from frame_rates import plan_lecture
+from memory_guard import MemoryBudget, available_memory_mb
+from render_budget import FULL, RenderBudget
+from render_history import RenderHistory
+from sync_video_audio import concat_segments
+from thumbnails import thumbs_dir_for
+
+
+def slide_hash(slide, profile):
+    """Content hash of everything that determines a slide's synced output"""
+    digest = hashlib.sha256()
+    digest.update(Path(slide["manim_file"]).read_bytes())
+    for part in (slide["scene"], slide["narration"], slide["voice"], slide["rate"], profile,
+                 str(slide.get("frame_rate")), str(slide.get("timeline_frame_rate"))):
+        digest.update(b"\0" + part.encode("utf-8"))
+    return digest.hexdigest()
+
+
+# Job events that also move the job to that state
+JOB_STATES = ("queued", "assembling", "done", "failed")
+
+
+class Job:
+    """One submitted lecture and the status events produced for it"""
+
+    def __init__(self, lecture, priority, profile):
+        self.id = uuid.uuid4().hex[:12]
+        self.lecture = lecture
+        self.priority = priority
+        self.profile = profile
+        self.state = "queued"
+        self.remaining = 0
+        self.events = []
+        self.changed = threading.Condition()
+
+    def emit(self, event, **fields):
+        with self.changed:
+            if event in JOB_STATES:
+                self.state = event  # Under the lock, so a watcher woken by this event sees the state
+            self.events.append({"event": event, "job": self.id, "ts": round(time.time(), 3), **fields})
+            self.changed.notify_all()
+        progress.emit("job", state=event, job=self.id, lecture=self.lecture["name"], **fields)
+
+    @property
+    def finished(self):
+        return self.state in ("done", "failed")
+
+
+class RenderServer:
+    """
+    Priority queue of slide tasks. Up to `workers` slides run at once, fewer
+    when their historical peak memory would not fit in the memory budget.
+    """
+
+    def __init__(self, out_dir, workers, rss_limit_mb=DEFAULT_RSS_LIMIT_MB, budget=None):
+        self.out_dir = Path(out_dir)
+        self.render_budget = budget
+        self.jobs = {}
+        self.queue = []
+        self.queued = {}  # slide hash -> (priority, slide, profile, future) of a task not yet started
+        self.in_flight = {}
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.has_work = threading.Condition(self.lock)
+        self.report = EncodeReport()
+        self.history = RenderHistory()
+        self.rss_limit_mb = rss_limit_mb
+        free_mb = available_memory_mb()
+        self.budget = MemoryBudget(free_mb * MEMORY_HEADROOM if free_mb else None)
+        for _ in range(workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, lecture, priority=0, profile=DEFAULT_PROFILE):
+        """Queue the slides of a lecture as one job; ValueError if a scene fails the dry-run check"""
+        failures = validate_lectures([lecture])
+        if failures:
+            # Rejected before any slide takes a worker
+            raise ValueError("; ".join(f"{Path(manim_file).name}:{scene}: {error}"
+                                       for (manim_file, scene), error in sorted(failures.items())))
+        plan_lecture(lecture, profile)
+        if self.render_budget is not None:
+            self.render_budget.start(lecture["name"])  # The SLA clock runs from submission
+        job = Job(lecture, priority, profile)
+        self.jobs[job.id] = job
+        job.emit("queued", title=lecture["title"], slides=len(lecture["slides"]), priority=priority)
+
+        futures = []
+        with self.lock:
+            for slide in lecture["slides"]:
+                key = slide_hash(slide, profile)
+                future = self.in_flight.get(key)
+                metrics.cache_lookup("in_flight", future is not None)
+                if future is None:
+                    # Slides are stored by content hash so duplicates share one output
+                    slide = {**slide, "work_dir": self.out_dir / "slides" / key[:16], "index": 0,
+                             "number": slide["index"] + 1}
+                    future = Future()
+                    future.timings = {"queued": time.monotonic()}
+                    self.in_flight[key] = future
+                    self._push(key, slide, profile, future, priority)
+                else:
+                    job.emit("deduplicated", slide=slide["index"], hash=key[:16])
+                    queued = self.queued.get(key)
+                    if queued is not None and priority > queued[0]:
+                        # Still waiting: queue it again at this job's priority, the old entry is skipped
+                        self._push(key, queued[1], queued[2], future, priority)
+                futures.append(future)
+
+        job.remaining = len(futures)
+        for index, future in enumerate(futures):
+            future.add_done_callback(lambda f, i=index: self._slide_done(job, i, f, futures))
+        return job
+
+    def _push(self, key, slide, profile, future, priority):
+        """Queue a slide task; call with self.lock held"""
+        self.queued[key] = (priority, slide, profile, future)
+        heapq.heappush(self.queue, (-priority, next(self.counter), key, slide, profile, future))
+        self.has_work.notify()
+
+    def _slide_done(self, job, index, future, futures):
+        # Seconds the slide waited for a worker, waited for memory, and ran
+        timings = future.timings
+        degraded = {"render": future.render_step} if future.render_step not in (None, FULL) else {}
+        job.emit("slide_done" if future.result() else "slide_failed", slide=index,
+                 title=job.lecture["slides"][index]["title"],
+                 queue_s=round(timings["dequeued"] - timings["queued"], 3),
+                 admission_s=round(timings["admitted"] - timings["dequeued"], 3),
+                 run_s=round(timings["finished"] - timings["admitted"], 3), **degraded)
+        with job.changed:
+            job.remaining -= 1
+            last = job.remaining == 0
+        if last:
+            threading.Thread(target=self._assemble, args=(job, futures), daemon=True).start()
+
+    def _worker(self):
+        while True:
+            with self.lock:
+                while True:
+                    while not self.queue:
+                        self.has_work.wait()
+                    _, _, key, slide, profile, future = heapq.heappop(self.queue)
+                    queued = self.queued.get(key)
+                    if queued is not None and queued[3] is future:
+                        del self.queued[key]
+                        break
+                    # Otherwise a leftover entry of a slide re-queued at a higher priority
+            future.timings["dequeued"] = time.monotonic()
+            reserved_mb = None
+            try:
+                memory_mb = slide_memory_mb(slide, self.history, profile)
+                self.budget.acquire(memory_mb)
+                reserved_mb = memory_mb
+                future.timings["admitted"] = time.monotonic()
+                segment = run_slide(slide, profile, self.report, self.rss_limit_mb, self.history,
+                                    budget=self.render_budget)
+            except Exception as e:
+                print(f"  ✗ {slide['scene']}: {e}")
+                segment = None
+            finally:
+                if reserved_mb is not None:
+                    self.budget.release(reserved_mb)
+            future.timings.setdefault("admitted", time.monotonic())  # Failed before admission
+            future.timings["finished"] = time.monotonic()
+            future.render_step = slide.get("render_step")
+            with self.lock:
+                self.in_flight.pop(key, None)
+            future.set_result(segment)
+
+    def _assemble(self, job, futures):
+        segments = [future.result() for future in futures]
+        if not all(segments):
+            job.emit("failed", reason=f"{segments.count(None)} slides failed")
+            return
+        job.emit("assembling")
+        start = time.monotonic()
+        final_output = self.out_dir / f"{job.lecture['name']}_{job.id}.mp4"
+        slides = [{**slide, "render_step": future.render_step}
+                  for slide, future in zip(job.lecture["slides"], futures)]
+        thumbs_dir = thumbs_dir_for(final_output)
+        if concat_segments(segments, final_output, self.out_dir / f"{job.id}_list.txt", job.profile, slides,
+                           thumbs_dir):
+            job.emit("done", output=str(final_output), thumbnails=str(thumbs_dir),
+                     assemble_s=round(time.monotonic() - start, 3))
+        else:
+            job.emit("failed", reason="concat failed")
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.0"
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) tuple
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path != "/jobs":
+            return self._send_json(404, {"error": "not found"})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            profile = body.get("profile", DEFAULT_PROFILE)
+            if profile not in PROFILES:
+                raise ValueError(f"unknown profile '{profile}'")
+            server = self.server.render_server
+            if "scriptPath" in body:
+                lecture = load_lecture(body["scriptPath"], server.out_dir)
+            else:
+                script = body["script"]
+                name = script.get("name") or Path(script.get("manimFile", "lecture")).stem
+                lecture = expand_lecture(script, name, Path.cwd(), server.out_dir / name)
+            job = server.submit(lecture, int(body.get("priority", 0)), profile)
+        except (KeyError, ValueError, OSError) as e:
+            return self._send_json(400, {"error": str(e)})
+        self._send_json(202, {"id": job.id})
+
+    def do_GET(self):
+        server = self.server.render_server
+        if self.path == "/metrics":
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", metrics.CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path == "/jobs":
+            return self._send_json(200, [
+                {"id": job.id, "title": job.lecture["title"], "state": job.state, "priority": job.priority}
+                for job in server.jobs.values()
+            ])
+
+        job = server.jobs.get(self.path.rsplit("/", 1)[-1]) if self.path.startswith("/jobs/") else None
+        if job is None:
+            return self._send_json(404, {"error": "not found"})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        sent = 0
+        while True:
+            with job.changed:
+                while sent == len(job.events) and not job.finished:
+                    job.changed.wait()
+                events = job.events[sent:]
+            for event in events:
+                self.wfile.write((json.dumps(event) + "\n").encode("utf-8"))
+            self.wfile.flush()
+            sent += len(events)
+            if job.finished and sent == len(job.events):
+                break
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local render job server")
+    parser.add_argument("--port", type=int, default=8765, help="port on 127.0.0.1")
+    parser.add_argument("--socket", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--out-dir", default="server_output")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rss-limit-mb", type=int, default=DEFAULT_RSS_LIMIT_MB)
+    parser.add_argument("--scene-budget", type=float, help="seconds a scene render may take before it is degraded")
+    parser.add_argument("--lecture-budget", type=float, help="seconds from submission to a finished lecture")
+    parser.add_argument("--progress", metavar="TARGET",
+                        help="also write job and frame progress as NDJSON to fd:N, unix:PATH, tcp:HOST:PORT or a file")
+    args = parser.parse_args()
+
+    if args.progress:
+        progress.configure(args.progress)
+
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+        httpd = UnixHTTPServer(args.socket, RequestHandler)
+        where = args.socket
+    else:
+        httpd = ThreadingHTTPServer(("127.0.0.1", args.port), RequestHandler)
+        where = f"http://127.0.0.1:{args.port}"
+    budget = None
+    if args.scene_budget or args.lecture_budget:
+        budget = RenderBudget(args.scene_budget, args.lecture_budget)
+    httpd.render_server = RenderServer(args.out_dir, args.workers, args.rss_limit_mb, budget)
+
+    print(f"🎬 Render server listening on {where} ({args.workers} workers)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down")
+
+
+if __name__ == "__main__":
+    main()
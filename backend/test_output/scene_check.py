@@ -0,0 +1,209 @@
+"""
+Dry-run scene validation
+Compiles a Manim module and runs every Scene's construct() with all
+animations skipped and nothing written, which takes milliseconds per scene
+instead of minutes of rendering. After every play()/wait() the mobjects on
+screen are checked, so broken scripts are rejected before they take a slot
+in the render pool.
+
+Reported per scene:
+    error      exception raised while building the scene (with its line)
+    warnings   text wider than the frame or running past its edge,
+               mobjects partly or entirely outside the frame
+
+The checks run in a child process so manim's global config and any crash
+or endless loop in a generated script stay out of the caller.
+
+Run with: python scene_check.py ml_video.py
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+import traceback
+from pathlib import Path
+
+CHECK_TIMEOUT = 120
+# Frame units a mobject may stick out before it counts (stroke widths, glow)
+EDGE_TOLERANCE = 0.05
+
+
+def check_scenes(manim_file, scene_names=None, timeout=CHECK_TIMEOUT):
+    """
+    Validate the scenes of `manim_file`; returns {scene: {"error", "warnings", "ms"}}.
+    A module that does not compile reports its error under every requested scene
+    (or under "<module>" when no scenes were named).
+    """
+    cmd = [sys.executable, str(Path(__file__).resolve()), str(manim_file), "--json"]
+    if scene_names:
+        cmd += ["--scenes", *scene_names]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+    except subprocess.TimeoutExpired:
+        report = {"error": f"validation timed out after {timeout}s", "scenes": {}}
+    except (ValueError, IndexError):
+        lines = result.stderr.strip().splitlines()
+        report = {"error": lines[-1] if lines else "validation crashed", "scenes": {}}
+
+    if report["error"]:
+        failed = {"error": report["error"], "warnings": [], "ms": 0}
+        return {name: failed for name in (scene_names or ["<module>"])}
+    return report["scenes"]
+
+
+def _describe(mobject):
+    text = getattr(mobject, "text", None) or getattr(mobject, "tex_string", None)
+    if text:
+        text = " ".join(str(text).split())
+        return f"{type(mobject).__name__}({text[:40]!r})"
+    return type(mobject).__name__
+
+
+def _bounds(mobject):
+    points = mobject.get_all_points()
+    if len(points) == 0:
+        return None
+    low, high = points.min(axis=0), points.max(axis=0)
+    return low[0], high[0], low[1], high[1]
+
+
+def _layout_warnings(scene, play_index, text_types, seen):
+    """Text overflow and off-frame mobjects currently in the scene"""
+    from manim import config
+
+    half_width = config.frame_width / 2 + EDGE_TOLERANCE
+    half_height = config.frame_height / 2 + EDGE_TOLERANCE
+    warnings = []
+
+    def report(mobject, message):
+        key = (id(mobject), message)
+        if key not in seen:
+            seen.add(key)
+            warnings.append(f"after animation {play_index}: {_describe(mobject)} {message}")
+
+    def check_texts(mobject):
+        if isinstance(mobject, text_types):
+            bounds = _bounds(mobject)
+            if bounds is None:
+                return
+            left, right, bottom, top = bounds
+            if right - left > config.frame_width:
+                report(mobject, f"is {right - left:.1f} wide, frame is {config.frame_width:.1f}")
+            elif left < -half_width or right > half_width or bottom < -half_height or top > half_height:
+                report(mobject, "runs past the frame edge")
+            return
+        for submobject in mobject.submobjects:
+            check_texts(submobject)
+
+    for mobject in scene.mobjects:
+        check_texts(mobject)
+        bounds = _bounds(mobject)
+        if bounds is None or isinstance(mobject, text_types):
+            continue
+        left, right, bottom, top = bounds
+        if right < -half_width or left > half_width or top < -half_height or bottom > half_height:
+            report(mobject, "is entirely off-frame")
+        elif left < -half_width or right > half_width or bottom < -half_height or top > half_height:
+            report(mobject, "is partly off-frame")
+    return warnings
+
+
+def _error_line(error, manim_file):
+    """Exception text with the line of the scene script it came from"""
+    message = f"{type(error).__name__}: {error}"
+    lines = [frame.lineno for frame in traceback.extract_tb(error.__traceback__)
+             if Path(frame.filename).resolve() == Path(manim_file).resolve()]
+    return f"{message} (line {lines[-1]})" if lines else message
+
+
+def _validate(manim_file, scene_names=None):
+    """Child side of check_scenes(): compile, then dry-run every scene"""
+    try:
+        compile(Path(manim_file).read_text(encoding="utf-8"), str(manim_file), "exec")
+    except SyntaxError as e:
+        return {"error": f"SyntaxError: {e.msg} (line {e.lineno})", "scenes": {}}
+
+    from manim import MarkupText, MathTex, Paragraph, Tex, Text, config
+    from manim.renderer.cairo_renderer import CairoRenderer
+
+    from lecture_renderer import load_scene_module
+
+    text_types = (Text, MarkupText, Paragraph, MathTex, Tex)
+
+    class CheckingRenderer(CairoRenderer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.warnings = []
+            self.seen = set()
+
+        def play(self, scene, *args, **kwargs):
+            super().play(scene, *args, **kwargs)
+            self.warnings += _layout_warnings(scene, self.num_plays - 1, text_types, self.seen)
+
+    config.dry_run = True
+    config.disable_caching = True
+    try:
+        _, scenes = load_scene_module(manim_file)
+    except Exception as e:
+        return {"error": _error_line(e, manim_file), "scenes": {}}
+
+    by_name = {scene.__name__: scene for scene in scenes}
+    results = {}
+    for name in scene_names or list(by_name):
+        start = time.perf_counter()
+        error = None
+        renderer = CheckingRenderer(skip_animations=True)
+        if name not in by_name:
+            error = f"no Scene named {name}"
+        else:
+            try:
+                by_name[name](renderer=renderer).render()
+            except Exception as e:
+                error = _error_line(e, manim_file)
+        results[name] = {
+            "error": error,
+            "warnings": renderer.warnings,
+            "ms": round((time.perf_counter() - start) * 1000),
+        }
+    return {"error": None, "scenes": results}
+
+
+def print_report(results):
+    """Print check_scenes() results; returns True when no scene has an error"""
+    ok = True
+    for name, result in results.items():
+        if result["error"]:
+            ok = False
+            print(f"  ✗ {name}: {result['error']}")
+        else:
+            print(f"  ✓ {name} ({result['ms']} ms)")
+        for warning in result["warnings"]:
+            print(f"    ⚠ {warning}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate Manim scenes without rendering them")
+    parser.add_argument("manim_file", help="Manim script to check")
+    parser.add_argument("--scenes", nargs="+", help="scene names (default: all)")
+    parser.add_argument("--json", action="store_true", help="print the raw report as JSON")
+    args = parser.parse_args()
+
+    if args.json:
+        print(json.dumps(_validate(args.manim_file, args.scenes)))
+        return
+
+    print("=" * 60)
+    print(f"Checking scenes: {args.manim_file}")
+    print("=" * 60)
+    if print_report(check_scenes(args.manim_file, args.scenes)):
+        print("\n✅ All scenes built without errors")
+    else:
+        print("\n✗ Some scenes are broken")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Intra-scene parallel rendering
+Splits one long scene at play()/wait() boundaries into sections of roughly
+equal run time and renders each section in its own `manim render -n a,b`
+process. Every process runs construct() from the top with the animations
+before its section skipped, which fast-forwards the scene state without
+rasterizing a frame. The section MP4s are joined by stream copy.
+
+Animation run times come from a dry pass that executes construct() with all
+animations skipped. Sections are rendered with a fixed random seed so scenes
+using random colors/positions build the same mobjects in every process.
+
+Run with: python scene_sections.py ml_video_extended.py TrainingProcess --sections 4 -o TrainingProcess.mp4
+"""
+import argparse
+import json
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import metrics
+import progress
+from checkpoint import atomic_output, produced
+from encoding_profiles import DEFAULT_PROFILE, PROFILES, manim_args
+from frame_rates import MANIM_MAIN
+from memory_guard import run_with_rss_limit
+
+# Splitting off less than this costs more in process start-up than it saves
+MIN_SECTION_SECONDS = 5.0
+SECTION_SEED = 0
+
+_SEEDED_MANIM = "import random, numpy; random.seed({seed}); numpy.random.seed({seed})\n"
+
+
+def animation_durations(manim_file, scene, env=None):
+    """Run time in seconds of every play()/wait() of `scene`, in order"""
+    result = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), str(manim_file), scene, "--durations"],
+        capture_output=True, text=True, env=env
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"dry pass of {scene} failed: {result.stderr.strip()[-500:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _dry_pass(manim_file, scene_name):
+    """Execute construct() with every animation skipped and record each play's run time"""
+    import random
+
+    import numpy as np
+    from manim import config
+    from manim.renderer.cairo_renderer import CairoRenderer
+
+    from lecture_renderer import load_scene_module
+
+    class TimingRenderer(CairoRenderer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.durations = []
+
+        def play(self, scene, *args, **kwargs):
+            super().play(scene, *args, **kwargs)
+            self.durations.append(scene.duration)
+
+    config.dry_run = True
+    config.disable_caching = True
+    random.seed(SECTION_SEED)
+    np.random.seed(SECTION_SEED)
+    _, scenes = load_scene_module(manim_file)
+    scene_class = next(scene for scene in scenes if scene.__name__ == scene_name)
+    renderer = TimingRenderer(skip_animations=True)
+    scene_class(renderer=renderer).render()
+    return [float(duration) for duration in renderer.durations]
+
+
+def split_ranges(durations, sections):
+    """
+    Cut the animation list into at most `sections` contiguous (first, last)
+    index ranges (inclusive, as `manim -n` takes them) of similar run time.
+    """
+    total = sum(durations)
+    sections = max(1, min(sections, len(durations), int(total // MIN_SECTION_SECONDS)))
+    ranges, start, elapsed = [], 0, 0.0
+    for i, duration in enumerate(durations):
+        elapsed += duration
+        cuts_left = sections - len(ranges) - 1
+        if cuts_left and elapsed >= total * (len(ranges) + 1) / sections and len(durations) - i - 1 >= cuts_left:
+            ranges.append((start, i))
+            start = i + 1
+    if start < len(durations):
+        ranges.append((start, len(durations) - 1))
+    return ranges
+
+
+def _render_section(manim_file, scene, first, last, media_dir, profile, rss_limit_mb, env, timeout):
+    """Render animations `first` to `last` of `scene` (all of it when `first` is None)"""
+    returncode, peak_mb, killed = run_with_rss_limit([
+        sys.executable, "-c", _SEEDED_MANIM.format(seed=SECTION_SEED) + MANIM_MAIN,
+        "render", *manim_args(profile), "--disable_caching", *(["-n", f"{first},{last}"] if first is not None else []),
+        str(manim_file), scene, "--media_dir", str(media_dir)
+    ], rss_limit_mb, timeout, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env,
+        pass_fds=progress.pass_fds())
+    if killed or returncode != 0:
+        return None, peak_mb
+    matches = sorted((Path(media_dir) / "videos" / Path(manim_file).stem).glob(f"*/{scene}.mp4"))
+    return (matches[0] if matches else None), peak_mb
+
+
+def _section_env(env, section, share):
+    """`env` with the section and its share of the scene's frames in the progress context"""
+    if env is None or progress.CONTEXT_ENV not in env:
+        return env
+    context = json.loads(env[progress.CONTEXT_ENV])
+    if context.get("total_frames"):
+        context["total_frames"] = round(context["total_frames"] * share)
+    return {**env, progress.CONTEXT_ENV: json.dumps({**context, "section": section})}
+
+
+def join_sections(parts, output_file):
+    """Concatenate section MP4s (same encoder settings by construction) without re-encoding"""
+    output_file = Path(output_file)
+    list_file = output_file.with_name(f"{output_file.stem}_sections.txt")
+    list_file.write_text("".join(f"file '{Path(part).resolve().as_posix()}'\n" for part in parts),
+                         encoding="utf-8")
+    metrics.FFMPEG_INVOCATIONS.inc(stage="join_sections")
+    with atomic_output(output_file) as output:
+        result = subprocess.run([
+            "ffmpeg", "-y",
+            "-f", "concat", "-safe", "0",
+            "-i", str(list_file),
+            "-c", "copy",
+            str(output.path)
+        ], capture_output=True)
+        output.ok = result.returncode == 0 and produced(output.path)
+    return output.ok
+
+
+def render_sections(manim_file, scene, output_file, media_dir, sections, profile=DEFAULT_PROFILE,
+                    rss_limit_mb=None, env=None, timeout=None):
+    """
+    Render `scene` as up to `sections` parallel sections joined into `output_file`.
+    Returns (output_file or None, combined peak RSS in MB or None).
+    """
+    durations = animation_durations(manim_file, scene, env)
+    ranges = split_ranges(durations, sections)
+    total = sum(durations) or 1.0
+    media_dir = Path(media_dir)
+    if ranges:
+        jobs = [(first, last, sum(durations[first:last + 1]) / total) for first, last in ranges]
+    else:
+        jobs = [(None, None, 1.0)]  # No play()/wait() to split at: render the scene whole
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = [
+            pool.submit(_render_section, manim_file, scene, first, last, media_dir / f"section_{k:02d}",
+                        profile, rss_limit_mb, _section_env(env, k, share), timeout)
+            for k, (first, last, share) in enumerate(jobs)
+        ]
+        rendered = [future.result() for future in futures]
+
+    peaks = [peak for _, peak in rendered if peak is not None]
+    peak_mb = sum(peaks) if peaks else None  # Sections run side by side
+    parts = [part for part, _ in rendered]
+    if not all(parts):
+        print(f"  ✗ {scene}: {parts.count(None)} of {len(parts)} sections failed")
+        return None, peak_mb
+    Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+    if not join_sections(parts, output_file):
+        return None, peak_mb
+    return Path(output_file), peak_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render one scene as parallel animation ranges")
+    parser.add_argument("manim_file", help="Manim script containing the scene")
+    parser.add_argument("scene", help="scene class name")
+    parser.add_argument("--sections", type=int, default=4, help="max parallel sections")
+    parser.add_argument("-o", "--output", help="joined MP4 path (default: <scene>.mp4)")
+    parser.add_argument("--media-dir", default="media/sections", help="where section renders go")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE)
+    parser.add_argument("--durations", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.durations:
+        # Child mode for animation_durations(): keep manim's config out of the caller's process
+        print(json.dumps(_dry_pass(args.manim_file, args.scene)))
+        return
+
+    durations = animation_durations(args.manim_file, args.scene)
+    ranges = split_ranges(durations, args.sections)
+    print("=" * 60)
+    print(f"Sectioned render: {args.scene}, {len(durations)} animations, {sum(durations):.1f}s")
+    print("=" * 60)
+    for first, last in ranges:
+        print(f"  Animations {first}-{last}: {sum(durations[first:last + 1]):.1f}s")
+
+    output_file = Path(args.output or f"{args.scene}.mp4")
+    output, _ = render_sections(args.manim_file, args.scene, output_file, args.media_dir, args.sections,
+                                args.profile)
+    if output:
+        print(f"\n✅ Joined {len(ranges)} sections: {output}")
+    else:
+        print("\n✗ Sectioned render failed")
+
+
+if __name__ == "__main__":
+    main()
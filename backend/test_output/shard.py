@@ -0,0 +1,463 @@
+"""
+Multi-node render sharding over a shared job directory
+Any number of worker processes, on one host or many, render the slides of a
+course from one directory they all mount (NFS, SMB, or just /tmp locally):
+
+    lectures/<name>.json        planned lecture: profile, slide tasks, build inputs
+    sources/<name>/<file>.py    the lecture's Manim file, so every node renders the same code
+    tasks/<task>.json           one slide (render, narrate, sync) and its predicted cost
+    leases/<task>.lease         who is working on a task; created with O_EXCL, so one node wins
+    done/<task>.json            finished task: its segment, or the error once it gave up
+    work/<task>/                the task's checkpoints, renders and synced segment
+    work/<task>.<n>/            the same after the n-th takeover of an expired lease
+
+A worker claims the costliest task without a done marker by creating its
+lease file and keeps it alive with a heartbeat (the file's mtime). A lease
+not renewed for its TTL belongs to a dead or frozen node and is taken over.
+A frozen node may wake up and keep writing, so the new holder starts in a
+work directory of its own; retries after a clean release reuse the
+checkpoints of the current one and skip whatever finished.
+Clocks of the nodes must be roughly in sync (NTP) - the TTL is compared to
+mtimes set by the file server. Segments stay in the shared store, so any
+node can assemble a lecture once all its tasks are done.
+
+Run with: python shard.py enqueue courses/ --shared /tmp/shard
+          python shard.py work --shared /tmp/shard --jobs 2     (as many as you like, anywhere)
+          python shard.py assemble --shared /tmp/shard --out-dir course_output --wait
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from batch_render import DEFAULT_RSS_LIMIT_MB, MEMORY_HEADROOM, lecture_inputs, load_lecture, run_slide, \
+    slide_cost, slide_memory_mb, validate_lectures
+from checkpoint import atomic_output, get_manifest
+from encoding_profiles import DEFAULT_PROFILE, PROFILES, EncodeReport
+from frame_rates import plan_lecture
+from memory_guard import MemoryBudget, available_memory_mb
+from render_budget import FULL
+from render_history import RenderHistory
+from sync_video_audio import concat_segments
+from thumbnails import thumbs_dir_for
+
+# A lease not renewed for this long is taken over by another node
+DEFAULT_LEASE_SECONDS = 300
+# Heartbeats per lease TTL
+HEARTBEATS_PER_TTL = 4
+# A task that failed this often is marked done with its error instead of retried
+MAX_ATTEMPTS = 3
+POLL_SECONDS = 5
+
+
+def _write_json(path, data):
+    """
+    Replace `path` atomically, so readers on other nodes never see half a file.
+    Every call writes its own temp file: several nodes may write the same path.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_output(path, shared=True) as output:
+        output.path.write_text(json.dumps(data, indent=2, default=str), encoding="utf-8")
+        output.ok = True
+
+
+def _json_files(directory):
+    """JSON files in `directory`, without the temp files of writes still in flight"""
+    return sorted(path for path in Path(directory).glob("*.json") if ".partial" not in path.name)
+
+
+def _read_json(path):
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None  # Missing, or replaced while reading
+
+
+class Lease:
+    """
+    Exclusive claim on a task through a lease file shared by all nodes.
+    While held, a heartbeat thread renews the file's mtime; `lost` turns true
+    if another node took the lease over after it expired. `took_over` is true
+    if this node got the lease by breaking an expired one.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_LEASE_SECONDS):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lost = False
+        self.took_over = False
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def acquire(self):
+        """Try to claim the lease (breaking an expired one); True if this node now holds it"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                if not self._break_expired():
+                    return False
+                continue
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"owner": self.owner, "ttl": self.ttl, "acquired": time.time()}, f)
+            self._heartbeat = threading.Thread(target=self._renew, daemon=True)
+            self._heartbeat.start()
+            return True
+        return False
+
+    def _holder(self, path=None):
+        return _read_json(path or self.path) or {}
+
+    def _break_expired(self):
+        """Remove the lease file if its holder stopped renewing it; True if it is gone"""
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            return True
+        holder = self._holder()
+        # An empty or unreadable file is being written, or its writer died: give it the longest default
+        ttl = holder.get("ttl", max(self.ttl, DEFAULT_LEASE_SECONDS))
+        if mtime + ttl > time.time():
+            return False
+        # Rename first: of several nodes breaking the same lease only one gets the file
+        stale = self.path.with_name(f"{self.path.name}.{self.owner}.stale")
+        try:
+            os.rename(self.path, stale)
+        except FileNotFoundError:
+            return True
+        if self._holder(stale).get("owner") != holder.get("owner"):
+            # Another node broke it and claimed it in between - put its fresh lease back
+            try:
+                os.link(stale, self.path)
+            except FileExistsError:
+                pass
+            stale.unlink(missing_ok=True)
+            return False
+        stale.unlink(missing_ok=True)
+        print(f"  ⚠ {self.path.stem}: lease of {holder.get('owner', 'an unknown node')} expired - taking over")
+        self.took_over = True
+        return True
+
+    def held(self):
+        return self._holder().get("owner") == self.owner
+
+    def _renew(self):
+        while not self._stop.wait(self.ttl / HEARTBEATS_PER_TTL):
+            if not self.held():
+                self.lost = True
+                return
+            try:
+                os.utime(self.path)
+            except OSError:
+                self.lost = True
+                return
+
+    def release(self):
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+        if not self.lost and self.held():
+            self.path.unlink(missing_ok=True)
+
+
+class SharedStore:
+    """Paths and records of a shared job directory"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def relative(self, path):
+        """Paths are stored relative to the root: nodes may mount it in different places"""
+        return Path(path).resolve().relative_to(self.root.resolve()).as_posix()
+
+    def task_path(self, task_id):
+        return self.root / "tasks" / f"{task_id}.json"
+
+    def done_path(self, task_id):
+        return self.root / "done" / f"{task_id}.json"
+
+    def lease(self, name, ttl=DEFAULT_LEASE_SECONDS):
+        return Lease(self.root / "leases" / f"{name}.lease", ttl)
+
+    def lectures(self):
+        return [_read_json(path) for path in _json_files(self.root / "lectures")]
+
+    def tasks(self):
+        tasks = [_read_json(path) for path in _json_files(self.root / "tasks")]
+        return [task for task in tasks if task]
+
+    def done(self, task):
+        """Done marker of `task`, if it belongs to the task's current inputs"""
+        marker = _read_json(self.done_path(task["id"]))
+        return marker if marker and marker.get("inputs") == task["inputs"] else None
+
+    def slide(self, task):
+        """The task's slide with its paths resolved under this node's mount of the store"""
+        generation = task.get("generation", 0)
+        work_dir = self.root / "work" / (f"{task['id']}.{generation}" if generation else task["id"])
+        return {**task["slide"], "manim_file": self.root / task["slide"]["manim_file"], "work_dir": work_dir}
+
+
+def enqueue(script_dir, shared, profile=DEFAULT_PROFILE):
+    """
+    Publish one task per slide of every lecture script in `script_dir`.
+    Tasks whose slide did not change keep their done marker; edited slides
+    and tasks that gave up are run again. A lecture with a scene that fails
+    the dry-run check is not published. Returns the number of tasks that
+    still have to run.
+    """
+    store = SharedStore(shared)
+    history = RenderHistory()
+    pending = 0
+    lectures = [plan_lecture(load_lecture(path, store.root / "work"), profile)
+                for path in sorted(Path(script_dir).glob("*.json"))]
+    failures = validate_lectures(lectures)
+    for lecture in lectures:
+        broken = [(slide, failures[(slide["manim_file"], slide["scene"])]) for slide in lecture["slides"]
+                  if (slide["manim_file"], slide["scene"]) in failures]
+        if broken:
+            # No node should spend a lease on a scene that cannot even be built
+            for slide, error in broken:
+                print(f"  ✗ {lecture['name']} slide {slide['index'] + 1}: {slide['scene']}: {error}")
+            print(f"  ✗ {lecture['name']}: not queued")
+            continue
+        sources = {}
+        for manim_file in {slide["manim_file"] for slide in lecture["slides"]}:
+            copy = store.root / "sources" / lecture["name"] / Path(manim_file).name
+            copy.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(manim_file, copy)
+            sources[manim_file] = store.relative(copy)
+
+        task_ids = []
+        for slide in lecture["slides"]:
+            task_id = f"{lecture['name']}--{slide['index'] + 1:03d}"
+            record = {key: value for key, value in slide.items() if key not in ("work_dir", "scratch_dir")}
+            record["manim_file"] = sources[slide["manim_file"]]
+            record["source_hash"] = hashlib.sha256(Path(slide["manim_file"]).read_bytes()).hexdigest()
+            inputs = hashlib.sha256(json.dumps([record, profile], sort_keys=True, default=str).encode("utf-8"))
+            task = {"id": task_id, "profile": profile, "inputs": inputs.hexdigest(),
+                    "cost": slide_cost(slide, history, profile), "attempts": 0, "slide": record}
+            existing = _read_json(store.task_path(task_id))
+            if existing and existing.get("generation"):
+                task["generation"] = existing["generation"]  # A taken-over holder may still use the old directory
+            marker = store.done(existing) if existing else None
+            if marker is not None and not marker.get("segment"):
+                store.done_path(task_id).unlink(missing_ok=True)  # Failed before - another round of attempts
+                marker = None
+            if marker is None or existing["inputs"] != task["inputs"]:
+                _write_json(store.task_path(task_id), task)
+                pending += 1
+            task_ids.append(task_id)
+
+        _write_json(store.root / "lectures" / f"{lecture['name']}.json", {
+            "name": lecture["name"], "title": lecture["title"], "profile": profile, "tasks": task_ids,
+            "inputs": lecture_inputs(lecture, profile),
+        })
+        print(f"  ✓ {lecture['name']}: {len(task_ids)} tasks")
+    return pending
+
+
+class ShardWorker:
+    """Claims and runs tasks of a shared store until none are left, `jobs` at a time"""
+
+    def __init__(self, shared, jobs=1, rss_limit_mb=DEFAULT_RSS_LIMIT_MB, lease_seconds=DEFAULT_LEASE_SECONDS,
+                 poll=POLL_SECONDS):
+        self.store = SharedStore(shared)
+        self.jobs = jobs
+        self.rss_limit_mb = rss_limit_mb
+        self.lease_seconds = lease_seconds
+        self.poll = poll
+        self.report = EncodeReport()
+        self.history = RenderHistory()
+        free_mb = available_memory_mb()
+        self.budget = MemoryBudget(free_mb * MEMORY_HEADROOM if free_mb else None)
+        self.completed = 0
+
+    def run(self):
+        threads = [threading.Thread(target=self._loop) for _ in range(self.jobs)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.completed
+
+    def _loop(self):
+        while True:
+            pending = [task for task in self.store.tasks() if self.store.done(task) is None]
+            if not pending:
+                return
+            for task in sorted(pending, key=lambda task: task["cost"], reverse=True):
+                lease = self.store.lease(task["id"], self.lease_seconds)
+                if lease.acquire():
+                    try:
+                        self._run(task, lease)
+                    finally:
+                        lease.release()
+                    break
+            else:
+                # Everything left is leased by other nodes: wait in case one of them dies
+                time.sleep(self.poll)
+
+    def _run(self, task, lease):
+        # Re-read under the lease: the task may have finished or changed since it was listed
+        task = _read_json(self.store.task_path(task["id"]))
+        if task is None or self.store.done(task) is not None:
+            return
+        task["attempts"] += 1
+        if lease.took_over:
+            # The previous holder may only be frozen and still write to its directory
+            task["generation"] = task.get("generation", 0) + 1
+        _write_json(self.store.task_path(task["id"]), task)
+
+        slide = self.store.slide(task)
+        start = time.monotonic()
+        reserved_mb = None
+        try:
+            memory_mb = slide_memory_mb(slide, self.history, task["profile"])
+            self.budget.acquire(memory_mb)
+            reserved_mb = memory_mb
+            segment = run_slide(slide, task["profile"], self.report, self.rss_limit_mb, self.history)
+        except Exception as e:
+            print(f"  ✗ {task['id']}: {e}")
+            segment = None
+        finally:
+            if reserved_mb is not None:
+                self.budget.release(reserved_mb)
+
+        if lease.lost or not lease.held():
+            print(f"  ⚠ {task['id']}: lease lost while running - result left to the new holder")
+            return
+        marker = {"inputs": task["inputs"], "worker": lease.owner, "seconds": round(time.monotonic() - start, 1)}
+        if segment is not None:
+            marker.update(segment=self.store.relative(segment), render_step=slide.get("render_step"))
+        elif task["attempts"] >= MAX_ATTEMPTS:
+            marker.update(segment=None, error=f"failed {task['attempts']} times")
+        else:
+            print(f"  ✗ {task['id']}: attempt {task['attempts']} of {MAX_ATTEMPTS} failed")
+            return
+        _write_json(self.store.done_path(task["id"]), marker)
+        self.completed += 1
+        print(f"  {'✓' if segment else '✗'} {task['id']} ({marker['seconds']:.0f}s)")
+
+
+def assemble(shared, out_dir, wait=False, poll=POLL_SECONDS):
+    """
+    Concatenate every lecture whose tasks are all done into `out_dir`. Only one
+    node assembles a lecture at a time; lectures already up to date are skipped.
+    With `wait`, keeps polling until every lecture is assembled or failed.
+    Returns {lecture name: output path or None if a task failed}.
+    """
+    store = SharedStore(shared)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = get_manifest(out_dir)
+    results = {}
+    while True:
+        for lecture in store.lectures():
+            if lecture is None or lecture["name"] in results:
+                continue
+            tasks = [_read_json(store.task_path(task_id)) for task_id in lecture["tasks"]]
+            markers = [store.done(task) if task else None for task in tasks]
+            if not all(markers):
+                continue
+            final_output = out_dir / f"{lecture['name']}.mp4"
+            if not all(marker.get("segment") for marker in markers):
+                failed = [task["id"] for task, marker in zip(tasks, markers) if not marker.get("segment")]
+                print(f"  ✗ {lecture['name']}: {', '.join(failed)} failed")
+                results[lecture["name"]] = None
+                continue
+            if manifest.is_done(final_output.name, final_output, lecture["inputs"]):
+                print(f"  ↺ {lecture['name']}: up to date")
+                results[lecture["name"]] = final_output
+                continue
+
+            lease = store.lease(f"assemble--{lecture['name']}")
+            if not lease.acquire():
+                continue  # Another node is assembling it
+            try:
+                segments = [store.root / marker["segment"] for marker in markers]
+                slides = [{**task["slide"], "render_step": marker.get("render_step")}
+                          for task, marker in zip(tasks, markers)]
+                list_file = store.root / "work" / f"{lecture['name']}_list.txt"
+                if concat_segments(segments, final_output, list_file, lecture["profile"], slides,
+                                   thumbs_dir_for(final_output)):
+                    if all(slide["render_step"] in (None, FULL) for slide in slides):
+                        manifest.record(final_output.name, final_output, lecture["inputs"])
+                    results[lecture["name"]] = final_output
+                    print(f"  ✓ {final_output}")
+                else:
+                    print(f"  ✗ {lecture['name']}: concat failed")
+                    results[lecture["name"]] = None
+            finally:
+                lease.release()
+        if not wait or len(results) == len(store.lectures()):
+            return results
+        time.sleep(poll)
+
+
+def status(shared):
+    """{task id: "done", "failed", "leased" or "pending"}"""
+    store = SharedStore(shared)
+    states = {}
+    for task in store.tasks():
+        marker = store.done(task)
+        if marker is not None:
+            states[task["id"]] = "done" if marker.get("segment") else "failed"
+        else:
+            lease_file = store.root / "leases" / f"{task['id']}.lease"
+            states[task["id"]] = "leased" if lease_file.exists() else "pending"
+    return states
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render lectures across several nodes sharing a directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    enqueue_parser = commands.add_parser("enqueue", help="publish the slides of a directory of lecture scripts")
+    enqueue_parser.add_argument("script_dir", help="directory containing lecture script JSON files")
+    enqueue_parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE)
+    work_parser = commands.add_parser("work", help="claim and render tasks until none are left")
+    work_parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="tasks run at once on this node")
+    work_parser.add_argument("--rss-limit-mb", type=int, default=DEFAULT_RSS_LIMIT_MB)
+    work_parser.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS,
+                             help="a lease not renewed for this long is taken over by another node")
+    assemble_parser = commands.add_parser("assemble", help="concatenate lectures whose slides are all done")
+    assemble_parser.add_argument("--out-dir", default="shard_output")
+    assemble_parser.add_argument("--wait", action="store_true", help="keep polling until every lecture is done")
+    commands.add_parser("status", help="count tasks by state")
+    for command in commands.choices.values():
+        command.add_argument("--shared", required=True, help="job directory shared by all nodes")
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        pending = enqueue(args.script_dir, args.shared, args.profile)
+        print(f"✅ {pending} tasks to render in {args.shared}")
+    elif args.command == "work":
+        print("=" * 60)
+        print(f"Shard worker {socket.gethostname()}:{os.getpid()}: {args.jobs} jobs on {args.shared}")
+        print("=" * 60)
+        completed = ShardWorker(args.shared, args.jobs, args.rss_limit_mb, args.lease_seconds).run()
+        print(f"✅ No tasks left - {completed} finished on this node")
+    elif args.command == "assemble":
+        results = assemble(args.shared, args.out_dir, args.wait)
+        failed = [name for name, output in results.items() if output is None]
+        if failed:
+            print(f"✗ {len(failed)} lectures failed: {', '.join(failed)}")
+            raise SystemExit(1)
+        print(f"✅ {len(results)} lectures assembled")
+    else:
+        counts = {}
+        for state in status(args.shared).values():
+            counts[state] = counts.get(state, 0) + 1
+        print(", ".join(f"{count} {state}" for state, count in sorted(counts.items())) or "no tasks")
+
+
+if __name__ == "__main__":
+    main()
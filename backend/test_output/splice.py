@@ -0,0 +1,244 @@
+"""
+Slide-level splicing of finished lectures
+Every synced slide is its own encode, so it starts on a keyframe, and the
+final MP4 is a stream copy of those segments: slide boundaries are always
+keyframe boundaries. concat_segments() stores where each slide starts in an
+index next to the video (<name>.slides.json) and embeds the same offsets as
+MP4 chapters named after the slide titles, so players can list and jump to
+slides.
+
+Patching a slide cuts the video at the slide boundaries with the segment
+muxer, swaps in the new segment (normalized first if its stream parameters
+differ) and joins the pieces again, all by stream copy. Nothing is decoded,
+so a patch takes seconds however long the lecture is. The chapters are
+rewritten from the updated index.
+
+Run with: python splice.py AI_Unveiled.mp4 --slide 3 --segment slide_03_synced.mp4
+      or: python splice.py batch_output/intro.mp4 --slide 3 --script courses/intro.json
+"""
+import argparse
+import json
+import subprocess
+import tempfile
+from pathlib import Path
+
+import metrics
+from checkpoint import atomic_output, get_manifest, media_duration
+from encoding_profiles import DEFAULT_PROFILE, PROFILES, container_args, get_frame_rate
+from preflight import PreflightError, match_segment
+
+INDEX_SUFFIX = ".slides.json"
+
+
+class SpliceError(RuntimeError):
+    pass
+
+
+def index_path(video):
+    return Path(video).with_suffix(INDEX_SUFFIX)
+
+
+def index_entries(durations, slides=None):
+    """Start and length of every slide; `slides` adds scene names, titles and render steps"""
+    entries, start = [], 0.0
+    for i, duration in enumerate(durations):
+        entry = {"slide": i + 1, "start": round(start, 6), "duration": round(duration, 6)}
+        if slides:
+            entry.update(scene=slides[i].get("scene", ""), title=slides[i].get("title", ""))
+            if slides[i].get("render_step"):
+                entry["render"] = slides[i]["render_step"]  # Degradation ladder step (see render_budget)
+        entries.append(entry)
+        start += duration
+    return entries
+
+
+def write_index(video, durations, slides=None):
+    """Record the start and length of every slide of `video` next to it"""
+    entries = index_entries(durations, slides)
+    with atomic_output(index_path(video)) as output:
+        output.path.write_text(json.dumps({"video": Path(video).name, "slides": entries}, indent=2),
+                               encoding="utf-8")
+        output.ok = True
+    return entries
+
+
+def _metadata_value(text):
+    for char in "\\=;#\n":
+        text = text.replace(char, "\\" + char)
+    return text
+
+
+def write_chapters(entries, metadata_file):
+    """
+    ffmetadata file with one chapter per index entry, titled after the slide
+    (its scene name, or its number, when the script gives no title).
+    Mux it in with: -f ffmetadata -i <metadata_file> ... -map_chapters <its input index>
+    """
+    lines = [";FFMETADATA1"]
+    for entry in entries:
+        title = entry.get("title") or entry.get("scene") or f"Slide {entry['slide']}"
+        lines += ["[CHAPTER]", "TIMEBASE=1/1000",
+                  f"START={round(entry['start'] * 1000)}",
+                  f"END={round((entry['start'] + entry['duration']) * 1000)}",
+                  f"title={_metadata_value(title)}"]
+    Path(metadata_file).write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return Path(metadata_file)
+
+
+def read_index(video):
+    path = index_path(video)
+    if not path.exists():
+        raise SpliceError(f"{path.name} not found - rebuild {Path(video).name} once to create it")
+    return json.loads(path.read_text(encoding="utf-8"))["slides"]
+
+
+def split_at_slides(video, entries, out_dir):
+    """Cut `video` into one file per slide by stream copy; returns their paths"""
+    # The segment muxer splits at the first keyframe at or after each cut time. Cutting half a
+    # frame early absorbs rounded offsets, and any other keyframe is at least a frame away
+    half_frame = 0.5 / (get_frame_rate(video) or 24)
+    cuts = ",".join(f"{entry['start'] - half_frame:.6f}" for entry in entries[1:])
+    segment_list = Path(out_dir) / "pieces.csv"
+    metrics.FFMPEG_INVOCATIONS.inc(stage="splice_split")
+    # Audio and video only: the chapter track stays behind, chapters are rewritten on the join
+    cmd = ["ffmpeg", "-y", "-i", str(video), "-map", "0:v", "-map", "0:a?", "-c", "copy", "-f", "segment",
+           "-segment_format", "mp4", "-reset_timestamps", "1",
+           "-segment_list", str(segment_list), "-segment_list_type", "csv"]
+    if cuts:
+        cmd += ["-segment_times", cuts]
+    subprocess.run([*cmd, str(Path(out_dir) / "piece_%03d.mp4")], capture_output=True)
+    pieces = sorted(Path(out_dir).glob("piece_*.mp4"))
+    if len(pieces) != len(entries):
+        raise SpliceError(f"expected {len(entries)} slides, cutting at the index gave {len(pieces)} - "
+                          f"keyframes are not on slide boundaries")
+    # Each piece must start where the index says, so it is exactly that slide (piece_%03d.mp4
+    # has no commas, so the csv is plain "name,start,end" lines)
+    rows = [line.split(",") for line in segment_list.read_text(encoding="utf-8").splitlines() if line]
+    for entry, (_, start, end) in zip(entries, rows):
+        if abs(float(start) - entry["start"]) > half_frame:
+            raise SpliceError(f"slide {entry['slide']} was cut at {float(start):.3f}s, the index says "
+                              f"{entry['start']:.3f}s - keyframes are not on slide boundaries")
+        if entry is not entries[-1] and abs(float(end) - float(start) - entry["duration"]) > half_frame:
+            raise SpliceError(f"slide {entry['slide']} is {float(end) - float(start):.3f}s after cutting, "
+                              f"the index says {entry['duration']:.3f}s")
+    return pieces
+
+
+def splice(video, slide_number, segment, profile=DEFAULT_PROFILE, output=None, render_step=None, slides=None):
+    """
+    Replace slide `slide_number` (1-based) of `video` with `segment` and write the
+    result to `output` (default: in place). `slides` gives the current scene names
+    and titles for the chapters (default: those in the index).
+    Returns the updated index entries.
+    """
+    video = Path(video)
+    output = Path(output or video)
+    entries = read_index(video)
+    if not 1 <= slide_number <= len(entries):
+        raise SpliceError(f"{video.name} has {len(entries)} slides, no slide {slide_number}")
+    if slides is not None and len(slides) != len(entries):
+        raise SpliceError(f"the script has {len(slides)} slides, {video.name} {len(entries)} - rebuild the lecture")
+    try:
+        segment = match_segment(segment, video, profile)
+    except PreflightError as e:
+        raise SpliceError(str(e))
+
+    with tempfile.TemporaryDirectory(dir=output.parent) as temp_dir:
+        parts = split_at_slides(video, entries, temp_dir)
+        parts[slide_number - 1] = Path(segment)
+        list_file = Path(temp_dir) / "splice_list.txt"
+        list_file.write_text("".join(f"file '{part.resolve().as_posix()}'\n" for part in parts),
+                             encoding="utf-8")
+        durations = [media_duration(part) or 0.0 for part in parts]
+        slides = [{"scene": slide.get("scene", ""), "title": slide.get("title", ""),
+                   "render_step": entry.get("render")} for slide, entry in zip(slides or entries, entries)]
+        slides[slide_number - 1]["render_step"] = render_step
+        chapters = write_chapters(index_entries(durations, slides), Path(temp_dir) / "chapters.txt")
+
+        metrics.FFMPEG_INVOCATIONS.inc(stage="splice_join")
+        with atomic_output(output) as remuxed:
+            result = subprocess.run([
+                "ffmpeg", "-y",
+                "-f", "concat", "-safe", "0",
+                "-i", str(list_file),
+                "-f", "ffmetadata", "-i", str(chapters),
+                "-map", "0:v", "-map", "0:a?", "-map_chapters", "1",
+                "-c", "copy",
+                *container_args(profile),
+                str(remuxed.path)
+            ], capture_output=True)
+            remuxed.ok = result.returncode == 0
+    if result.returncode != 0:
+        raise SpliceError(f"re-muxing {output.name} failed")
+    return write_index(output, durations, slides)
+
+
+def others_unchanged(previous, current, slide_number):
+    """True if two lecture_inputs() differ at most in slide `slide_number` (1-based)"""
+    previous, current = previous.split(","), current.split(",")
+    return len(previous) == len(current) and all(
+        old == new for i, (old, new) in enumerate(zip(previous, current), 1) if i != slide_number)
+
+
+def rebuild_slide(script, video, slide_number, profile=DEFAULT_PROFILE):
+    """Re-run one slide of a lecture script (checkpoints skip unchanged steps); returns (lecture, segment)"""
+    from batch_render import load_lecture, run_slide
+    from encoding_profiles import EncodeReport
+    from frame_rates import plan_lecture
+    from render_history import RenderHistory
+
+    lecture = plan_lecture(load_lecture(script, Path(video).parent), profile)
+    if not 1 <= slide_number <= len(lecture["slides"]):
+        raise SpliceError(f"{Path(script).name} has {len(lecture['slides'])} slides, no slide {slide_number}")
+    segment = run_slide(lecture["slides"][slide_number - 1], profile, EncodeReport(), history=RenderHistory())
+    if segment is None:
+        raise SpliceError(f"slide {slide_number} failed to build")
+    return lecture, segment
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replace one slide of a finished lecture by stream copy")
+    parser.add_argument("video", help="finished lecture MP4 with a .slides.json index next to it")
+    parser.add_argument("--slide", type=int, required=True, help="slide number (1-based)")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--segment", help="synced slide MP4 to splice in")
+    source.add_argument("--script", help="lecture script to rebuild the slide from")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE)
+    parser.add_argument("-o", "--output", help="write here instead of patching in place")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"Patching slide {args.slide} of {args.video}")
+    print("=" * 60)
+    try:
+        lecture, segment, render_step, slides, built = None, args.segment, None, None, False
+        if args.script:
+            from batch_render import lecture_inputs
+
+            lecture, segment = rebuild_slide(args.script, args.video, args.slide, args.profile)
+            # Journal the patched video as up to date only if it came from the last full build
+            # and every other slide is unchanged since then
+            manifest = get_manifest(lecture["work_dir"])
+            previous = manifest.entries.get(Path(args.video).name)
+            current = lecture_inputs(lecture, args.profile)
+            built = previous is not None and manifest.is_done(previous["key"], args.video, previous["inputs"]) \
+                and others_unchanged(previous["inputs"], current, args.slide)
+            render_step = lecture["slides"][args.slide - 1].get("render_step")
+            slides = lecture["slides"]
+        entries = splice(args.video, args.slide, segment, args.profile, args.output, render_step, slides)
+    except SpliceError as e:
+        print(f"✗ {e}")
+        raise SystemExit(1)
+
+    output = Path(args.output or args.video)
+    degraded = any(entry.get("render", "full") != "full" for entry in entries)
+    if built and output == Path(args.video) and not degraded:
+        # The patched file is what a full rebuild of the script would produce
+        manifest.record(output.name, output, current)
+    patched = entries[args.slide - 1]
+    print(f"✓ {output}: slide {args.slide} now {patched['duration']:.1f}s at {patched['start']:.1f}s, "
+          f"{len(entries)} slides")
+
+
+if __name__ == "__main__":
+    main()
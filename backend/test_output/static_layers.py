@@ -0,0 +1,112 @@
+"""
+Static background layer cache for the Cairo renderer
+Within one play() manim already rasterizes the mobjects that do not move
+into a static image once and draws only the moving ones on top of it each
+frame. But that static image is rebuilt from scratch at the start of every
+play(), although on a slide it is usually the same as the last one, or the
+last one plus whatever the previous animation just wrote (a title, a box, a
+timeline entry).
+
+LayerCachingRenderer fingerprints the static set (ids, points and style of
+every mobject in it) at each play() and
+    - reuses a cached layer when the static set is unchanged
+    - draws only the newly static mobjects onto the previous layer when the
+      set only grew on top
+    - rasterizes the layer from scratch otherwise (the set shrank, or a
+      static mobject was moved or restyled)
+
+Usage, before any Scene is created:
+    import static_layers
+    static_layers.install()
+"""
+import hashlib
+from collections import OrderedDict
+
+from manim import config
+from manim.camera.camera import Camera
+from manim.renderer.cairo_renderer import CairoRenderer
+
+import metrics
+
+# Full-frame RGBA images kept per renderer (8 MB each at 1080p)
+LAYER_CACHE_SIZE = 4
+# Everything that changes how a mobject rasterizes
+STATE_ATTRS = ("points", "fill_rgbas", "stroke_rgbas", "background_stroke_rgbas", "stroke_width",
+               "background_stroke_width", "sheen_factor", "sheen_direction", "z_index", "pixel_array")
+
+
+def mobject_fingerprint(mobject):
+    """Hash of the rasterized state of a mobject and its whole family"""
+    digest = hashlib.blake2b(digest_size=16)
+    for member in mobject.get_family():
+        digest.update(id(member).to_bytes(8, "little"))
+        for name in STATE_ATTRS:
+            value = getattr(member, name, None)
+            digest.update(value.tobytes() if hasattr(value, "tobytes") else repr(value).encode("utf-8"))
+    return digest.digest()
+
+
+class LayerCachingRenderer(CairoRenderer):
+    """CairoRenderer that carries the static layer over from one play() to the next"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.layers = OrderedDict()  # fingerprint tuple -> frame
+        self.last_layer = None  # (fingerprints, z_index, frame) of the latest layer
+        self.layer_stats = {"reused": 0, "extended": 0, "rebuilt": 0}
+
+    def _camera_key(self):
+        frame = getattr(self.camera, "frame", None)  # MovingCamera
+        return mobject_fingerprint(frame) if frame is not None else b""
+
+    def save_static_frame_data(self, scene, static_mobjects):
+        if self.skip_animations:
+            return super().save_static_frame_data(scene, static_mobjects)
+        self.static_image = None
+        static_mobjects = list(static_mobjects or [])
+        if not static_mobjects:
+            return None
+
+        key = (self._camera_key(),) + tuple(mobject_fingerprint(mobject) for mobject in static_mobjects)
+        z_index = max(getattr(mobject, "z_index", 0) for mobject in static_mobjects)
+        hit = True
+        if key in self.layers:
+            self.layers.move_to_end(key)
+            self.static_image = self.layers[key]
+            self.layer_stats["reused"] += 1
+        else:
+            previous = self.last_layer
+            added = len(key) - len(previous[0]) if previous else 0
+            if (previous and added > 0 and key[:len(previous[0])] == previous[0]
+                    and min(getattr(mobject, "z_index", 0) for mobject in static_mobjects[-added:]) >= previous[1]):
+                # Only new mobjects on top: draw them onto the previous layer
+                self.static_image = previous[2]
+                self.update_frame(scene, mobjects=static_mobjects[-added:])
+                self.layer_stats["extended"] += 1
+            else:
+                self.update_frame(scene, mobjects=static_mobjects)
+                self.layer_stats["rebuilt"] += 1
+                hit = False
+            self.static_image = self.get_frame()
+            self.layers[key] = self.static_image
+            if len(self.layers) > LAYER_CACHE_SIZE:
+                self.layers.popitem(last=False)
+        metrics.cache_lookup("static_layer", hit)
+        self.last_layer = (key, z_index, self.static_image)
+        return self.static_image
+
+
+def install():
+    """Make Scenes created afterwards use LayerCachingRenderer unless they are given a renderer"""
+    from manim.scene.scene import Scene
+
+    original_init = Scene.__init__
+
+    def __init__(self, *args, **kwargs):
+        cairo = getattr(config.renderer, "value", config.renderer) == "cairo"
+        if cairo and not args and kwargs.get("renderer") is None:
+            kwargs["renderer"] = LayerCachingRenderer(camera_class=kwargs.get("camera_class") or Camera,
+                                                      skip_animations=kwargs.get("skip_animations", False))
+        original_init(self, *args, **kwargs)
+
+    Scene.__init__ = __init__
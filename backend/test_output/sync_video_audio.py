@@ -2,16 +2,25 @@
 Synchronize video slides with their individual audio narrations
 Creates properly synced video with each slide matching its narration duration
 """
+import argparse
 import subprocess
 import os
 from pathlib import Path
 
+import metrics
+import progress
+from checkpoint import Manifest, atomic_output, fingerprint, produced
+from encoding_profiles import DEFAULT_PROFILE, PROFILES, EncodeReport, audio_args, container_args, \
+    get_duration, get_frame_rate, video_args
+from preflight import PreflightError, preflight
+from splice import index_entries, write_chapters, write_index
+from thumbnails import assemble_thumbnails, collect_sync_tiles, sync_filter_outputs, write_sprite_sheet
+
 # Paths
 BASE_DIR = Path(".")
 VIDEO_DIR = BASE_DIR / "media" / "videos" / "ai_unveiled" / "720p24"
 AUDIO_DIR = BASE_DIR / "ai_unveiled_output"
 OUTPUT_DIR = BASE_DIR / "synced_output"
-OUTPUT_DIR.mkdir(exist_ok=True)
 
 # Slide mappings
 SLIDES = [
@@ -25,111 +34,189 @@ SLIDES = [
     ("Slide8_Conclusion.mp4", "narration_07.mp3"),
 ]
 
-def get_duration(file_path):
-    """Get media file duration in seconds"""
-    result = subprocess.run([
-        "ffprobe", "-v", "error", 
-        "-show_entries", "format=duration",
-        "-of", "default=noprint_wrappers=1:nokey=1",
-        str(file_path)
-    ], capture_output=True, text=True)
-    return float(result.stdout.strip())
-
-def sync_slide_with_audio(video_file, audio_file, output_file):
+def sync_slide_with_audio(video_path, audio_path, output_file, profile=DEFAULT_PROFILE, report=None,
+                          thumbs_dir=None, index=0, frame_rate=None):
     """
     Sync a video slide with its audio narration.
     - If video is shorter than audio: loop/freeze last frame
     - If video is longer than audio: trim video to audio length
+    Both cases are encoded with the given profile so every slide shares
+    the same encoder settings before the final stream-copy concat.
+    The slide is written under a temp name and only renamed on success.
+    Returns `output_file`, or None if the encode failed.
+    With `thumbs_dir`, the same decode also writes sprite tiles and the
+    slide's chapter thumbnail (and the poster for the first slide).
+    With `frame_rate`, the slide is resampled to that output rate (frames of a
+    slower scene are repeated) so every slide of a lecture shares one timeline.
     """
-    video_path = VIDEO_DIR / video_file
-    audio_path = AUDIO_DIR / audio_file
-    
     video_dur = get_duration(video_path)
     audio_dur = get_duration(audio_path)
     
+    source_fps = get_frame_rate(video_path) or 24
+    fps = frame_rate or source_fps
+    
     print(f"  Video: {video_dur:.1f}s, Audio: {audio_dur:.1f}s")
     
+    with atomic_output(output_file) as output:
+        cmd = build_sync_command(video_path, audio_path, output.path, video_dur, audio_dur, fps, profile,
+                                 thumbs_dir, index, resample=abs(fps - source_fps) > 0.01)
+        if report is not None:
+            result = report.timed(profile, cmd, output.path, audio_dur, fps)
+        else:
+            metrics.FFMPEG_INVOCATIONS.inc(stage="sync")
+            metrics.FRAMES_ENCODED.inc(round(audio_dur * fps), stage="sync")
+            result = progress.run_ffmpeg(cmd, "sync", round(audio_dur * fps))
+        output.ok = ok = result.returncode == 0 and produced(output.path)
+    return output_file if ok else None
+
+def build_sync_command(video_path, audio_path, output_file, video_dur, audio_dur, fps, profile,
+                       thumbs_dir=None, index=0, resample=False):
+    """ffmpeg command that freezes or trims the slide video to the narration length"""
     if video_dur < audio_dur:
         # Video is shorter - we need to extend it
         # Use filter to loop/freeze the video to match audio duration
-        cmd = [
-            "ffmpeg", "-y",
-            "-i", str(video_path),
-            "-i", str(audio_path),
-            "-filter_complex", 
-            f"[0:v]tpad=stop_mode=clone:stop_duration={audio_dur - video_dur}[v]",
-            "-map", "[v]",
-            "-map", "1:a",
-            "-c:v", "libx264",
-            "-preset", "fast",
-            "-c:a", "aac",
-            "-shortest",
-            str(output_file)
-        ]
+        chain = f"[0:v]tpad=stop_mode=clone:stop_duration={audio_dur - video_dur}"
+        length_args = ["-shortest"]
     else:
         # Video is longer or equal - trim to audio duration
-        cmd = [
-            "ffmpeg", "-y",
-            "-i", str(video_path),
-            "-i", str(audio_path),
-            "-c:v", "copy",
-            "-c:a", "aac",
-            "-map", "0:v:0",
-            "-map", "1:a:0",
-            "-t", str(audio_dur),
-            str(output_file)
-        ]
+        chain = f"[0:v]trim=duration={audio_dur},setpts=PTS-STARTPTS"
+        length_args = ["-t", str(audio_dur)]
+    if resample:
+        # Repeat (or drop) frames to the output timeline rate
+        chain += f",fps={fps:g}"
+    
+    extra_outputs = []
+    if thumbs_dir is not None:
+        Path(thumbs_dir).mkdir(parents=True, exist_ok=True)
+        graph, extra_outputs = sync_filter_outputs(chain, thumbs_dir, index, audio_dur, fps, poster=index == 0)
+    else:
+        graph = f"{chain}[v]"
+    
+    return [
+        "ffmpeg", "-y",
+        "-i", str(video_path),
+        "-i", str(audio_path),
+        "-filter_complex", graph,
+        "-map", "[v]",
+        "-map", "1:a:0",
+        *video_args(profile, fps),
+        *audio_args(profile),
+        *length_args,
+        str(output_file),
+        *extra_outputs
+    ]
+
+def concat_segments(segments, final_output, list_file, profile=DEFAULT_PROFILE, slides=None, thumbs_dir=None):
+    """
+    Join synced slides into the final video by stream copy.
+    The preflight first normalizes any segment whose stream parameters or
+    A/V alignment would break a copy-concat.
+    The slide offsets are indexed next to the output so single slides can be
+    patched later (see splice), and embedded as chapters; `slides` adds their
+    scene names and titles. Every slide is its own encode, so each chapter
+    starts on a keyframe and seeking to a slide decodes nothing before it.
+    With `thumbs_dir`, the thumbnails each segment's sync wrote (see
+    thumbnails.thumbs_dir_for) become the video's poster, chapter
+    thumbnails and sprite sheet.
+    """
+    synced = segments  # Thumbnails sit next to the synced segments, not the normalized copies
+    try:
+        segments = preflight(segments, profile)
+    except PreflightError as e:
+        print(f"  ✗ Preflight failed: {e}")
+        return False
+    
+    with open(list_file, "w") as f:
+        for video in segments:
+            f.write(f"file '{Path(video).absolute().as_posix()}'\n")
+    durations = [get_duration(video) for video in segments]
+    chapters = write_chapters(index_entries(durations, slides),
+                              Path(list_file).with_name(f"{Path(list_file).stem}_chapters.txt"))
     
-    subprocess.run(cmd, capture_output=True)
-    return output_file
+    metrics.FFMPEG_INVOCATIONS.inc(stage="concat")
+    with atomic_output(final_output) as output:
+        result = subprocess.run([
+            "ffmpeg", "-y",
+            "-f", "concat",
+            "-safe", "0",
+            "-i", str(list_file),
+            "-f", "ffmetadata", "-i", str(chapters),
+            "-map", "0:v", "-map", "0:a?", "-map_chapters", "1",
+            "-c", "copy",
+            *container_args(profile),
+            str(output.path)
+        ], capture_output=True)
+        output.ok = ok = result.returncode == 0 and produced(output.path)
+    if not ok:
+        return False
+    write_index(final_output, durations, slides)
+    if thumbs_dir is not None:
+        assemble_thumbnails(synced, durations, thumbs_dir)
+    return True
 
 def main():
+    parser = argparse.ArgumentParser(description="Sync slide videos with their narrations")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help="encoding profile for synced slides and the final video")
+    args = parser.parse_args()
+    
+    OUTPUT_DIR.mkdir(exist_ok=True)
+    report = EncodeReport()
+    manifest = Manifest(OUTPUT_DIR)
+    
     print("=" * 60)
     print("Synchronizing AI Unveiled Video with Audio")
+    print(f"Encoding profile: {args.profile}")
     print("=" * 60)
     
     synced_videos = []
+    slides = []
+    thumbs_dir = OUTPUT_DIR / "thumbnails"
+    sprite_tiles = []
+    slide_start = 0.0
     
     for i, (video, audio) in enumerate(SLIDES):
         output_file = OUTPUT_DIR / f"slide_{i+1:02d}_synced.mp4"
         print(f"\nSlide {i+1}: {video}")
         
-        sync_slide_with_audio(video, audio, output_file)
-        
-        if output_file.exists():
-            dur = get_duration(output_file)
-            print(f"  ✓ Created synced slide: {dur:.1f}s")
-            synced_videos.append(output_file)
+        inputs = f"{args.profile}|{fingerprint(VIDEO_DIR / video, AUDIO_DIR / audio)}"
+        cached = manifest.is_done(output_file.name, output_file, inputs)
+        metrics.cache_lookup("segment", cached)
+        if cached:
+            entry = manifest.entries[output_file.name]
+            print(f"  ↺ Reusing synced slide from previous run")
         else:
-            print(f"  ✗ Failed to create synced slide")
+            if sync_slide_with_audio(VIDEO_DIR / video, AUDIO_DIR / audio, output_file, args.profile, report,
+                                     thumbs_dir, i) is None:
+                print(f"  ✗ Failed to create synced slide")
+                continue
+            entry = manifest.record(output_file.name, output_file, inputs)
+            print(f"  ✓ Created synced slide: {entry['duration'] or 0:.1f}s")
+        
+        synced_videos.append(output_file)
+        slides.append({"scene": Path(video).stem})  # No script titles here - chapters take the scene names
+        sprite_tiles += collect_sync_tiles(thumbs_dir, i, slide_start)
+        slide_start += entry["duration"] or 0
     
     # Create concat list
     print("\n" + "=" * 60)
     print("Concatenating all synced slides...")
     
-    list_file = OUTPUT_DIR / "synced_list.txt"
-    with open(list_file, "w") as f:
-        for video in synced_videos:
-            f.write(f"file '{video.name}'\n")
-    
     # Final concatenation
     final_output = BASE_DIR / "AI_Unveiled_Synced.mp4"
-    subprocess.run([
-        "ffmpeg", "-y",
-        "-f", "concat",
-        "-safe", "0",
-        "-i", str(list_file),
-        "-c", "copy",
-        str(final_output)
-    ], capture_output=True, cwd=str(OUTPUT_DIR))
-    
-    if final_output.exists():
+    inputs = f"{args.profile}|{fingerprint(*synced_videos)}"
+    if manifest.is_done(final_output.name, final_output, inputs) or \
+            concat_segments(synced_videos, final_output, OUTPUT_DIR / "synced_list.txt", args.profile, slides):
+        manifest.record(final_output.name, final_output, inputs)
         final_dur = get_duration(final_output)
         final_size = final_output.stat().st_size / (1024 * 1024)
         print(f"\n✅ Final synced video created!")
         print(f"   File: {final_output}")
         print(f"   Duration: {int(final_dur // 60)}m {int(final_dur % 60)}s")
         print(f"   Size: {final_size:.2f} MB")
+        if write_sprite_sheet(sprite_tiles, thumbs_dir, final_dur):
+            print(f"   Thumbnails: {thumbs_dir}")
+        report.print_summary()
     else:
         print("\n✗ Failed to create final video")
     
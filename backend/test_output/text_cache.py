@@ -0,0 +1,71 @@
+"""
+Memoized Text construction
+Building a Text mobject goes through Pango, writes an SVG to media/texts and
+parses it back into Bezier paths. Slides repeat the same strings and styles
+(titles, bullets, labels), so parsed Text mobjects are kept in an in-process
+LRU cache and every call hands out a copy. Renders that share a worker
+process - the one-pass lecture renderer in particular - reuse glyph outlines
+across scenes.
+
+Usage, before any scene is built:
+    import text_cache
+    text_cache.install()
+"""
+from collections import OrderedDict
+
+import manim
+
+import metrics
+
+CACHE_SIZE = 512
+# Arguments that change the glyph outlines; anything else is styling applied after copying
+SHAPE_ARGS = ("font", "font_size", "weight", "slant", "line_spacing", "disable_ligatures", "tab_width")
+STYLE_ARGS = ("color", "fill_opacity", "stroke_width")
+
+_original_init = manim.Text.__init__
+_cache = OrderedDict()
+stats = {"hits": 0, "misses": 0, "bypassed": 0}
+
+
+def _cached_init(self, text, *args, **kwargs):
+    """Text.__init__ that reuses previously parsed outlines; subclasses are built normally"""
+    if type(self) is not manim.Text:
+        return _original_init(self, text, *args, **kwargs)
+    if args or any(key not in SHAPE_ARGS + STYLE_ARGS for key in kwargs):
+        # t2c, gradients, width/height fitting etc. are rare - build those normally
+        stats["bypassed"] += 1
+        return _original_init(self, text, *args, **kwargs)
+
+    key = (text,) + tuple(kwargs.get(name) for name in SHAPE_ARGS)
+    template = _cache.get(key)
+    if template is None:
+        stats["misses"] += 1
+        metrics.cache_lookup("text", False)
+        shape_kwargs = {name: kwargs[name] for name in SHAPE_ARGS if name in kwargs}
+        template = manim.Text.__new__(manim.Text)
+        _original_init(template, text, **shape_kwargs)
+        _cache[key] = template
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    else:
+        stats["hits"] += 1
+        metrics.cache_lookup("text", True)
+        _cache.move_to_end(key)
+
+    # Become a copy of the template: still a real Text, so isinstance checks keep working
+    self.__dict__.update(template.copy().__dict__)
+    if "color" in kwargs:
+        self.set_color(kwargs["color"])
+    if "fill_opacity" in kwargs:
+        self.set_fill(opacity=kwargs["fill_opacity"])
+    if "stroke_width" in kwargs:
+        self.set_stroke(width=kwargs["stroke_width"])
+
+
+def install():
+    """Build Text mobjects through the cache from now on (manim.Text itself is patched)"""
+    manim.Text.__init__ = _cached_init
+
+
+def clear():
+    _cache.clear()
@@ -0,0 +1,171 @@
+"""
+Poster, chapter thumbnails and scrub sprite sheet
+Built from frames the assembly stage already has instead of decoding the
+finished MP4 again:
+- the one-pass renderer hands its raw frames to ThumbnailCollector
+- the per-slide sync encode gets extra ffmpeg outputs (sync_filter_outputs)
+  that tap the decode it is already doing
+- slides synced on their own (batch, server, shard) keep them next to their
+  segment until assembly renumbers them for the lecture (assemble_thumbnails)
+
+Output layout (in the thumbnail directory):
+    poster.jpg            frame at POSTER_TIME
+    slide_01.jpg ...      last frame of each slide, for chapter menus
+    sprites.jpg           grid of TILE-sized frames every SPRITE_INTERVAL seconds
+    sprites.vtt           WebVTT cues pointing into sprites.jpg (#xywh=...)
+"""
+import shutil
+from pathlib import Path
+
+from PIL import Image
+
+POSTER_TIME = 2.0
+SPRITE_INTERVAL = 5
+TILE_WIDTH = 160
+TILE_HEIGHT = 90
+SPRITE_COLUMNS = 10
+CHAPTER_WIDTH = 320
+
+
+def chapter_path(thumbs_dir, index):
+    return Path(thumbs_dir) / f"slide_{index + 1:02d}.jpg"
+
+
+def _timestamp(seconds):
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{secs:06.3f}"
+
+
+def write_sprite_sheet(tiles, thumbs_dir, total_duration):
+    """
+    Tile (start_seconds, image) pairs into sprites.jpg and write sprites.vtt.
+    Each cue runs until the next tile starts (or the end of the video).
+    """
+    thumbs_dir = Path(thumbs_dir)
+    if not tiles:
+        return None
+    tiles = sorted(tiles, key=lambda tile: tile[0])
+    rows = (len(tiles) + SPRITE_COLUMNS - 1) // SPRITE_COLUMNS
+    sheet = Image.new("RGB", (SPRITE_COLUMNS * TILE_WIDTH, rows * TILE_HEIGHT))
+
+    cues = ["WEBVTT", ""]
+    for i, (start, image) in enumerate(tiles):
+        x = (i % SPRITE_COLUMNS) * TILE_WIDTH
+        y = (i // SPRITE_COLUMNS) * TILE_HEIGHT
+        if not isinstance(image, Image.Image):
+            image = Image.open(image)
+        sheet.paste(image.convert("RGB").resize((TILE_WIDTH, TILE_HEIGHT)), (x, y))
+        end = tiles[i + 1][0] if i + 1 < len(tiles) else total_duration
+        cues += [f"{_timestamp(start)} --> {_timestamp(end)}",
+                 f"sprites.jpg#xywh={x},{y},{TILE_WIDTH},{TILE_HEIGHT}", ""]
+
+    sheet.save(thumbs_dir / "sprites.jpg", quality=80)
+    (thumbs_dir / "sprites.vtt").write_text("\n".join(cues), encoding="utf-8")
+    return thumbs_dir / "sprites.jpg"
+
+
+class ThumbnailCollector:
+    """Takes raw RGBA frames from the renderer as they are encoded"""
+
+    def __init__(self, thumbs_dir, fps):
+        self.thumbs_dir = Path(thumbs_dir)
+        self.thumbs_dir.mkdir(parents=True, exist_ok=True)
+        self.fps = fps
+        self.tiles = []
+        self.next_tile_time = 0.0
+        self.poster_done = False
+
+    def add_frame(self, frame, frame_number, count=1):
+        """
+        Called for every encoded frame (or run of `count` identical frames);
+        only converts the few frames it keeps
+        """
+        time = frame_number / self.fps
+        last_time = (frame_number + count - 1) / self.fps
+        tile = None
+        while self.next_tile_time <= last_time:
+            if tile is None:
+                tile = Image.fromarray(frame).convert("RGB").resize((TILE_WIDTH, TILE_HEIGHT))
+            self.tiles.append((max(time, self.next_tile_time), tile))
+            self.next_tile_time += SPRITE_INTERVAL
+        if not self.poster_done and last_time >= POSTER_TIME:
+            Image.fromarray(frame).convert("RGB").save(self.thumbs_dir / "poster.jpg", quality=90)
+            self.poster_done = True
+
+    def end_slide(self, index, last_frame):
+        if last_frame is None:
+            return
+        image = Image.fromarray(last_frame).convert("RGB")
+        height = round(image.height * CHAPTER_WIDTH / image.width)
+        image.resize((CHAPTER_WIDTH, height)).save(chapter_path(self.thumbs_dir, index), quality=85)
+
+    def finish(self, total_frames):
+        write_sprite_sheet(self.tiles, self.thumbs_dir, total_frames / self.fps)
+
+
+def sync_filter_outputs(chain, thumbs_dir, index, duration, fps, poster=False):
+    """
+    Extra filter graph and ffmpeg outputs for a slide's sync encode.
+    Splits the video `chain` (`duration` seconds at `fps`) so the main encode
+    keeps [v] while the same decoded frames feed the sprite tiles, the chapter
+    thumbnail and (first slide only) the poster. Returns (filter_graph, output_args).
+    Tiles of an earlier sync of the slide are removed first, so a shorter
+    slide leaves none behind.
+    """
+    thumbs_dir = Path(thumbs_dir)
+    prefix = f"slide_{index + 1:02d}"
+    for stale in thumbs_dir.glob(f"{prefix}_tile_*.jpg"):
+        stale.unlink(missing_ok=True)
+    branches = 4 if poster else 3
+    # Only the last two frames reach the chapter thumbnail; -update 1 keeps the final one
+    last_start = max(0.0, duration - 2 / fps)
+    graph = [
+        f"{chain},split={branches}[v][tiles][last]{'[poster]' if poster else ''}",
+        f"[tiles]fps=1/{SPRITE_INTERVAL}:round=down,scale={TILE_WIDTH}:{TILE_HEIGHT}[tiles_out]",
+        f"[last]trim=start={last_start:.6f},setpts=PTS-STARTPTS,scale={CHAPTER_WIDTH}:-2[last_out]",
+    ]
+    outputs = [
+        "-map", "[tiles_out]", "-q:v", "5", str(thumbs_dir / f"{prefix}_tile_%03d.jpg"),
+        "-map", "[last_out]", "-q:v", "3", "-update", "1", str(chapter_path(thumbs_dir, index)),
+    ]
+    if poster:
+        graph.append(f"[poster]trim=start={POSTER_TIME},setpts=PTS-STARTPTS[poster_out]")
+        outputs += ["-map", "[poster_out]", "-frames:v", "1", "-q:v", "2", str(thumbs_dir / "poster.jpg")]
+    return ";".join(graph), outputs
+
+
+def collect_sync_tiles(thumbs_dir, index, slide_start):
+    """Tile images written by a slide's sync encode, with their lecture timestamps"""
+    tiles = sorted(Path(thumbs_dir).glob(f"slide_{index + 1:02d}_tile_*.jpg"))
+    return [(slide_start + k * SPRITE_INTERVAL, path) for k, path in enumerate(tiles)]
+
+
+def thumbs_dir_for(video):
+    """Thumbnail directory that goes with a video: <stem>_thumbnails next to it"""
+    video = Path(video)
+    return video.with_name(f"{video.stem}_thumbnails")
+
+
+def assemble_thumbnails(segments, durations, thumbs_dir):
+    """
+    Poster, chapter thumbnails and sprite sheet of a video joined from
+    `segments` (each `durations` seconds long), out of the thumbnails their
+    sync encodes left in thumbs_dir_for() each segment, synced as slide 0 so
+    every segment has its own poster. Returns the sprite sheet path.
+    """
+    thumbs_dir = Path(thumbs_dir)
+    thumbs_dir.mkdir(parents=True, exist_ok=True)
+    for stale in thumbs_dir.glob("slide_*.jpg"):
+        stale.unlink(missing_ok=True)
+    tiles = []
+    start = 0.0
+    for i, (segment, duration) in enumerate(zip(segments, durations)):
+        source = thumbs_dir_for(segment)
+        if i == 0 and (source / "poster.jpg").exists():
+            shutil.copyfile(source / "poster.jpg", thumbs_dir / "poster.jpg")
+        if chapter_path(source, 0).exists():
+            shutil.copyfile(chapter_path(source, 0), chapter_path(thumbs_dir, i))
+        tiles += collect_sync_tiles(source, 0, start)
+        start += duration
+    return write_sprite_sheet(tiles, thumbs_dir, start)
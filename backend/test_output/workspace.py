@@ -0,0 +1,145 @@
+"""
+Build workspaces: RAM scratch, intermediate GC and disk budgets
+Everything a lecture build only needs until its final MP4 exists (manim
+media dirs with partial movie files and text SVGs, per-scene MP4s, synced
+slides, concat lists) goes into a per-job scratch directory. Scratch lives
+on tmpfs (/dev/shm) when it has room for the job, otherwise next to the
+output on disk.
+
+- partial movie files are dropped as soon as manim has joined them
+- the whole scratch directory and the on-disk intermediates are removed once
+  the final output has been verified
+- per-job and global byte budgets are checked as the build grows, so a
+  runaway job fails instead of filling the disk
+"""
+import shutil
+import threading
+from pathlib import Path
+
+import metrics
+from checkpoint import media_duration
+
+TMPFS_ROOT = Path("/dev/shm")
+SCRATCH_NAME = "lecture_scratch"
+# tmpfs is RAM: never plan to leave less than this free for renders
+RAM_RESERVE_MB = 1024
+# Rough scratch need of one slide (per-scene MP4, synced slide, text SVGs) at the web profile
+SCRATCH_MB_PER_SLIDE = 150
+DEFAULT_JOB_BUDGET_MB = 4096
+DEFAULT_GLOBAL_BUDGET_MB = 20480
+# A verified final may differ from the sum of its segments by this much
+VERIFY_TOLERANCE = 0.5
+
+
+class DiskBudgetError(RuntimeError):
+    pass
+
+
+def tree_bytes(path):
+    path = Path(path)
+    if path.is_file():
+        return path.stat().st_size
+    total = 0
+    for child in path.rglob("*"):
+        try:
+            if child.is_file() and not child.is_symlink():
+                total += child.stat().st_size
+        except OSError:
+            continue  # Removed while walking
+    return total
+
+
+def outermost(paths):
+    """`paths` without those inside another of them, so no file is counted twice"""
+    paths = list(dict.fromkeys(Path(path).resolve() for path in paths))
+    return [path for path in paths if not any(other in path.parents for other in paths)]
+
+
+def free_mb(path):
+    try:
+        return shutil.disk_usage(path).free / (1024 * 1024)
+    except OSError:
+        return 0
+
+
+class WorkspaceManager:
+    """Hands out scratch directories and keeps every job inside its byte budgets"""
+
+    def __init__(self, disk_root, job_budget_mb=DEFAULT_JOB_BUDGET_MB, global_budget_mb=DEFAULT_GLOBAL_BUDGET_MB,
+                 use_tmpfs=True):
+        self.disk_root = Path(disk_root)
+        self.job_budget = job_budget_mb * 1024 * 1024 if job_budget_mb else None
+        self.global_budget = global_budget_mb * 1024 * 1024 if global_budget_mb else None
+        self.use_tmpfs = use_tmpfs
+        self.jobs = {}  # job -> directories counted against its budget
+        self.reclaimed = 0
+        self.lock = threading.Lock()
+
+    def scratch_dir(self, job, slides=1, work_dir=None):
+        """Scratch directory for `job`, on tmpfs if `slides` worth of intermediates fit there"""
+        planned_mb = slides * SCRATCH_MB_PER_SLIDE
+        with self.lock:
+            on_tmpfs = (self.use_tmpfs and TMPFS_ROOT.is_dir()
+                        and free_mb(TMPFS_ROOT) - self._tmpfs_planned_mb() - planned_mb > RAM_RESERVE_MB)
+            scratch = TMPFS_ROOT / SCRATCH_NAME / job if on_tmpfs else self.disk_root / job / "scratch"
+            scratch.mkdir(parents=True, exist_ok=True)
+            self.jobs[job] = {"scratch": scratch, "dirs": [scratch] + ([Path(work_dir)] if work_dir else []),
+                              "planned_mb": planned_mb if on_tmpfs else 0}
+        return scratch
+
+    def _tmpfs_planned_mb(self):
+        """Room promised to running jobs on tmpfs that they have not filled yet"""
+        return sum(max(0, job["planned_mb"] - tree_bytes(job["scratch"]) / (1024 * 1024))
+                   for job in self.jobs.values())
+
+    def job_bytes(self, job):
+        # On disk the scratch directory may sit inside the job's work_dir
+        return sum(tree_bytes(path) for path in outermost(self.jobs[job]["dirs"]) if path.exists())
+
+    def check(self, job):
+        """Raise DiskBudgetError if `job` or all jobs together are over budget"""
+        used = self.job_bytes(job)
+        if self.job_budget and used > self.job_budget:
+            raise DiskBudgetError(f"{job} uses {used / 2**20:.0f} MB, budget is {self.job_budget / 2**20:.0f} MB")
+        if self.global_budget:
+            total = sum(self.job_bytes(name) for name in list(self.jobs))
+            if total > self.global_budget:
+                raise DiskBudgetError(f"all jobs use {total / 2**20:.0f} MB, "
+                                      f"budget is {self.global_budget / 2**20:.0f} MB")
+
+    def reclaim(self, *paths):
+        """Delete files or directories and count the bytes freed"""
+        freed = 0
+        for path in paths:
+            path = Path(path)
+            if not path.exists():
+                continue
+            size = tree_bytes(path)
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+            freed += size - (tree_bytes(path) if path.exists() else 0)
+        with self.lock:
+            self.reclaimed += freed
+        metrics.BYTES_RECLAIMED.inc(freed)
+        return freed
+
+    def prune_render(self, media_dir, scene):
+        """Partial movie files of a scene manim has already joined into its MP4"""
+        return self.reclaim(*Path(media_dir).rglob(f"partial_movie_files/{scene}"))
+
+    def finish(self, job, final_output, expected_duration=None, intermediates=()):
+        """
+        Remove the job's scratch directory and `intermediates` once `final_output`
+        plays for about `expected_duration` seconds. Returns the bytes freed, or
+        None when the output did not verify and everything was kept.
+        """
+        duration = media_duration(final_output)
+        if duration is None or (expected_duration is not None
+                                and abs(duration - expected_duration) > VERIFY_TOLERANCE):
+            return None
+        freed = self.reclaim(self.jobs[job]["scratch"], *intermediates)
+        with self.lock:
+            self.jobs.pop(job, None)
+        return freed
@@ -8,11 +8,18 @@ import asyncio
 import subprocess
 import os
 import json
+import sys
 from pathlib import Path
 
 # Configuration
 OUTPUT_DIR = Path("test_output")
 OUTPUT_DIR.mkdir(exist_ok=True)
+sys.path.insert(0, str(OUTPUT_DIR))
+
+from checkpoint import Manifest, content_hash
+from encoding_profiles import manim_args
+from frame_rates import MANIM_MAIN, quality_env
+from scene_check import check_scenes, print_report
 
 # Sample 5-minute script (about 750-800 words at ~150 wpm)
 SCRIPT = {
@@ -368,8 +375,8 @@ def combine_audio_files(audio_files, output_path):
     return False
 
 
-def render_manim_scenes():
-    """Render Manim scenes to video"""
+def render_manim_scenes(profile="draft"):
+    """Render Manim scenes to video using the quality of an encoding profile"""
     print("\\n🎬 Rendering Manim scenes...")
     
     # Save Manim code
@@ -379,27 +386,49 @@ def render_manim_scenes():
     
     print(f"  ✓ Manim script saved to: {manim_file}")
     
+    # Scenes finished by an earlier (possibly crashed) run are reused
+    manifest = Manifest(OUTPUT_DIR)
+    inputs = f"{profile}|{content_hash(manim_file)}"
+    
     # Render each scene
     scenes = ["IntroScene", "WhatIsML", "TypesOfML", "NeuralNetworks", 
               "TrainingProcess", "KeyConcepts", "Applications", "GettingStarted"]
     
+    # Catch broken scenes in a dry run before spending render time on them
+    print("  Checking scenes...")
+    checks = check_scenes(manim_file, scenes)
+    print_report(checks)
+    
     video_files = []
     
     for scene in scenes:
+        if checks[scene]["error"]:
+            print(f"  ✗ Skipping {scene}: failed validation")
+            continue
         print(f"  Rendering {scene}...")
         output_video = OUTPUT_DIR / f"{scene}.mp4"
         
-        cmd = f'manim render -ql "{manim_file}" {scene} -o {scene}.mp4 --media_dir "{OUTPUT_DIR}"'
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        entry = manifest.entries.get(f"render:{scene}")
+        if entry and manifest.is_done(entry["key"], entry["path"], inputs):
+            video_files.append(entry["path"])
+            print(f"    ↺ Reusing: {Path(entry['path']).name}")
+            continue
+        
+        # The module sets its own size and frame rate; the pipeline entry point applies the profile's
+        quality = manim_args(profile)[0]
+        cmd = [sys.executable, "-c", MANIM_MAIN, "render", quality, str(manim_file), scene,
+               "-o", f"{scene}.mp4", "--media_dir", str(OUTPUT_DIR)]
+        result = subprocess.run(cmd, capture_output=True, text=True, env=quality_env(dict(os.environ), quality))
         
-        # Find the rendered video
+        # Find the rendered video (the resolution folder depends on the profile)
         possible_paths = [
-            OUTPUT_DIR / "videos" / "ml_video" / "480p15" / f"{scene}.mp4",
+            *sorted((OUTPUT_DIR / "videos" / "ml_video").glob(f"*/{scene}.mp4")),
             OUTPUT_DIR / f"{scene}.mp4"
         ]
         
         for path in possible_paths:
-            if path.exists():
+            if path.exists() and result.returncode == 0:
+                manifest.record(f"render:{scene}", path, inputs)
                 video_files.append(str(path))
                 print(f"    ✓ Rendered: {path.name}")
                 break